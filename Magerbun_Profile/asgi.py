@@ -3,6 +3,12 @@ ASGI config for Magerbun_Profile project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served this way, the async account endpoints (``api/account/async/login/`` and
+``api/account/async/register/``) run natively on the event loop instead of in
+a per-request thread, and ``api/menu/events/`` streams menu changes as
+Server-Sent Events, which Django 3.2 views can't do without holding a thread
+per client.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
@@ -13,4 +19,12 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Magerbun_Profile.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from menu_api.events import EVENTS_PATH, events_application  # noqa: E402  (needs the app registry)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        return await events_application(scope, receive, send)
+    return await django_application(scope, receive, send)
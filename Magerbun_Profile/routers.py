@@ -0,0 +1,115 @@
+"""
+Read replica routing.
+
+`ReplicaRoutingMiddleware` marks the reads of safe-method requests as
+replica-safe, and `ReplicaRouter` sends those reads to one of the
+`REPLICA_DATABASES`; everything else reads from and writes to `default`.
+
+Replicas lag behind the primary, so a client that has just written keeps
+reading from the primary for `REPLICA_STICKY_SECONDS`. The client is
+recognised by its Authorization header, remembered in the `shared` cache
+so every worker knows, and by a cookie set on the write's response, which
+covers clients that write before they have a token, such as registration.
+"""
+import contextvars
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'primary_until'
+STICKY_CACHE = 'shared'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_reads_from_replica = contextvars.ContextVar('reads_from_replica', default=False)
+
+
+def replicas():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or not _reads_from_replica.get():
+            return DEFAULT_DB_ALIAS
+        # The database cache, which holds the sticky clients, is written
+        # on the primary and must be read there too.
+        if model._meta.app_label == 'django_cache':
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction must see its own writes.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+
+def _sticky_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return 'replica-sticky:' + hashlib.sha256(authorization.encode()).hexdigest()
+
+
+def _is_sticky(request, now):
+    try:
+        if float(request.COOKIES.get(STICKY_COOKIE, 0)) > now:
+            return True
+    except ValueError:
+        pass
+    key = _sticky_key(request)
+    if key is None:
+        return False
+    try:
+        return caches[STICKY_CACHE].get(key, 0) > now
+    except Exception:
+        # Without the cache the primary is the safe place to read from.
+        return True
+
+
+def _stick(request, response, now):
+    window = sticky_seconds()
+    if window <= 0:
+        return
+    until = now + window
+    key = _sticky_key(request)
+    if key is not None:
+        try:
+            caches[STICKY_CACHE].set(key, until, timeout=window)
+        except Exception:
+            # The write went through; the cookie still covers the client.
+            pass
+    response.set_cookie(STICKY_COOKIE, f'{until:.3f}', max_age=window, httponly=True, samesite='Lax')
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replicas():
+            return self.get_response(request)
+
+        now = time.time()
+        safe = request.method in SAFE_METHODS
+        token = _reads_from_replica.set(safe and not _is_sticky(request, now))
+        try:
+            response = self.get_response(request)
+        finally:
+            _reads_from_replica.reset(token)
+        if not safe:
+            _stick(request, response, now)
+        return response
@@ -0,0 +1,103 @@
+"""
+Read-only fast path for list endpoints.
+
+`ValuesSerializer` produces the same rows as `serializer_class(queryset,
+many=True).data` straight from `.values_list()` tuples, without building
+model instances or walking DRF's per-field machinery for every row, and
+`FastJSONRenderer` encodes those rows byte-for-byte like `JSONRenderer`.
+"""
+import json
+
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+# Fields whose `to_representation` returns database values unchanged.
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.EmailField,
+    serializers.IntegerField,
+)
+
+
+class ValuesSerializer:
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @cached_property
+    def columns(self):
+        """
+        (key, source, converter) for every readable field, in output order.
+        `converter` is None when the database value can be used as is.
+        """
+        columns = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source:
+                raise ValueError(f'{self.serializer_class.__name__}.{name} is not backed by a single column')
+            converter = None if type(field) in PASSTHROUGH_FIELDS else field.to_representation
+            columns.append((name, field.source, converter))
+        return columns
+
+    @cached_property
+    def keys(self):
+        return tuple(name for name, _, _ in self.columns)
+
+    @cached_property
+    def sources(self):
+        return tuple(source for _, source, _ in self.columns)
+
+    def iter_rows(self, queryset, chunk_size=None):
+        """
+        Yield the rows of `queryset`. With `chunk_size`, rows are fetched
+        with `QuerySet.iterator()` instead of being cached all at once.
+        """
+        for row, _ in self.iter_keyed_rows(queryset, chunk_size = chunk_size):
+            yield row
+
+    def iter_keyed_rows(self, queryset, key_fields=(), chunk_size=None):
+        """
+        Like `iter_rows`, but also fetch `key_fields` in the same query and
+        yield `(row, key)` pairs, e.g. for building pagination cursors.
+        """
+        keys = self.keys
+        width = len(keys)
+        converters = [(index, converter) for index, (_, _, converter) in enumerate(self.columns) if converter]
+        values_list = queryset.values_list(*self.sources, *key_fields)
+        if chunk_size:
+            values_list = values_list.iterator(chunk_size = chunk_size)
+        for values in values_list:
+            row = list(values[:width]) if converters else values[:width]
+            for index, converter in converters:
+                if row[index] is not None:
+                    row[index] = converter(row[index])
+            yield dict(zip(keys, row)), values[width:]
+
+    def rows(self, queryset):
+        return list(self.iter_rows(queryset))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    A `JSONRenderer` that encodes plain lists and dicts of rows with a
+    prebuilt encoder and falls back to `JSONRenderer` for anything else.
+    """
+    fast_encoder = json.JSONEncoder(
+        ensure_ascii = JSONRenderer.ensure_ascii,
+        allow_nan = not JSONRenderer.strict,
+        separators = (',', ':') if JSONRenderer.compact else (', ', ': ')
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if type(data) not in (list, dict) or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = self.fast_encoder.encode(data)
+        except TypeError:
+            # Something in the rows needs the DRF encoder (dates, decimals...).
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
@@ -52,18 +52,95 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'account.authentication.CachedTokenAuthentication',
+        'account.authentication.SignedTokenAuthentication',
         # 'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    # Reverse proxies in front of the app whose X-Forwarded-For entries are
+    # trusted; with 0 throttles key on REMOTE_ADDR, which clients can't forge
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
+# In-process token -> account cache used by CachedTokenAuthentication; changes
+# reach every worker through the shared cache below
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))
+TOKEN_CACHE_MAX_SIZE = int(os.environ.get('TOKEN_CACHE_MAX_SIZE', 10000))
+
+# Lifetime in seconds of the signed access tokens issued by `login/`
+SIGNED_TOKEN_TTL = int(os.environ.get('SIGNED_TOKEN_TTL', 900))
+
+# Thread pool the async login/register endpoints hash passwords on. Requests
+# beyond HASHING_POOL_SIZE running plus HASHING_POOL_QUEUE_LIMIT waiting get a 503.
+HASHING_POOL_SIZE = int(os.environ.get('HASHING_POOL_SIZE', os.cpu_count() or 1))
+HASHING_POOL_QUEUE_LIMIT = int(os.environ.get('HASHING_POOL_QUEUE_LIMIT', 32))
+
+# Login attempts allowed per client IP and per email within a sliding
+# LOGIN_THROTTLE_WINDOW seconds, and how many IPs/emails are tracked at most
+LOGIN_THROTTLE_PER_IP = int(os.environ.get('LOGIN_THROTTLE_PER_IP', 50))
+LOGIN_THROTTLE_PER_EMAIL = int(os.environ.get('LOGIN_THROTTLE_PER_EMAIL', 10))
+LOGIN_THROTTLE_WINDOW = int(os.environ.get('LOGIN_THROTTLE_WINDOW', 60))
+LOGIN_THROTTLE_MAX_KEYS = int(os.environ.get('LOGIN_THROTTLE_MAX_KEYS', 100000))
+
+# Seconds between the batched writes of accounts' last-seen times (0 disables
+# tracking; tests turn it off with override_settings), and how many accounts
+# each UPDATE covers
+ACTIVITY_FLUSH_INTERVAL = int(os.environ.get('ACTIVITY_FLUSH_INTERVAL', 60))
+ACTIVITY_FLUSH_BATCH_SIZE = int(os.environ.get('ACTIVITY_FLUSH_BATCH_SIZE', 500))
+
+# Largest rendered menu catalogue, in bytes, kept in each process's cache,
+# and the seconds after which it is rebuilt even if the version didn't move
+MENU_CACHE_MAX_BYTES = int(os.environ.get('MENU_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+MENU_CACHE_TTL = int(os.environ.get('MENU_CACHE_TTL', 300))
+
+# Days deleted menus are remembered for `changes/`
+MENU_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('MENU_TOMBSTONE_RETENTION_DAYS', 30))
+
+# Events kept per SSE client before the oldest are dropped, and the seconds
+# between keepalive comments on an idle feed
+MENU_EVENTS_QUEUE_SIZE = int(os.environ.get('MENU_EVENTS_QUEUE_SIZE', 100))
+MENU_EVENTS_HEARTBEAT = int(os.environ.get('MENU_EVENTS_HEARTBEAT', 15))
+
+# PRAGMAs the Magerbun_Profile.sqlite3 backend runs on every new connection
+# (https://www.sqlite.org/pragma.html). A negative cache size is in KiB
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'normal')
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+
+# Seconds a database connection is reused across requests (0 closes it after
+# every request), and whether a reused connection is checked first
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'true').lower() in ('1', 'true', 'yes')
+
+# Read replicas: comma-separated SQLite files that mirror db.sqlite3 (a copy
+# of it will do locally). Safe-method requests read from them, except for
+# REPLICA_STICKY_SECONDS after the same client writes
+DATABASE_REPLICAS = [path for path in os.environ.get('DATABASE_REPLICAS', '').split(',') if path]
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+# Cache every worker sees, for replica stickiness, revoked signed tokens and
+# the generations of cached tokens.
+# By default files under .shared_cache, which covers the workers of one host;
+# point it at memcached or redis when they run on several
+SHARED_CACHE_BACKEND = os.environ.get('SHARED_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache')
+SHARED_CACHE_LOCATION = os.environ.get('SHARED_CACHE_LOCATION', str(BASE_DIR / '.shared_cache'))
+
+# Keyset pagination of list endpoints (`?cursor=...&page_size=...`)
+KEYSET_PAGE_SIZE = int(os.environ.get('KEYSET_PAGE_SIZE', 100))
+KEYSET_MAX_PAGE_SIZE = int(os.environ.get('KEYSET_MAX_PAGE_SIZE', 1000))
+
+# Rows fetched and encoded per chunk by `?stream=1` exports
+STREAMING_CHUNK_SIZE = int(os.environ.get('STREAMING_CHUNK_SIZE', 2000))
+
 AUTH_USER_MODEL = 'account.Account'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'Magerbun_Profile.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -98,9 +175,43 @@ WSGI_APPLICATION = 'Magerbun_Profile.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'Magerbun_Profile.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        # Applied in this order; journal_mode must come before the rest.
+        'PRAGMAS': {
+            'journal_mode': SQLITE_JOURNAL_MODE,
+            'synchronous': SQLITE_SYNCHRONOUS,
+            'mmap_size': SQLITE_MMAP_SIZE,
+            'cache_size': SQLITE_CACHE_SIZE,
+            'busy_timeout': SQLITE_BUSY_TIMEOUT,
+        },
+    }
+}
+
+# Replicas are opened like the primary but refuse writes; tests read them
+# through the primary's test database.
+REPLICA_DATABASES = []
+for index, path in enumerate(DATABASE_REPLICAS, 1):
+    REPLICA_DATABASES.append(f'replica{index}')
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'PRAGMAS': {**DATABASES['default']['PRAGMAS'], 'query_only': 'on'},
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['Magerbun_Profile.routers.ReplicaRouter']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': SHARED_CACHE_BACKEND,
+        'LOCATION': SHARED_CACHE_LOCATION,
+    },
 }
 
 
@@ -0,0 +1,71 @@
+"""
+Streaming JSON exports for list endpoints.
+
+Rows are read with `QuerySet.iterator(chunk_size=...)` and encoded a batch
+at a time into a `StreamingHttpResponse`, so a worker only ever holds one
+chunk of rows no matter how large the table is. The bytes sent are the same
+as `FastJSONRenderer` produces for the whole list.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from Magerbun_Profile.serialization import FastJSONRenderer
+
+STREAM_QUERY_PARAM = 'stream'
+
+
+def wants_stream(request):
+    return request.query_params.get(STREAM_QUERY_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def get_chunk_size():
+    return getattr(settings, 'STREAMING_CHUNK_SIZE', 2000)
+
+
+def iter_json_array(rows, batch_size=None):
+    """
+    Encode an iterable of rows as a single JSON array, yielding one bytes
+    chunk per `batch_size` rows.
+    """
+    batch_size = batch_size or get_chunk_size()
+    encode = FastJSONRenderer.fast_encoder.encode
+    fallback = JSONEncoder(
+        ensure_ascii = JSONRenderer.ensure_ascii,
+        allow_nan = not JSONRenderer.strict,
+        separators = (FastJSONRenderer.fast_encoder.item_separator, FastJSONRenderer.fast_encoder.key_separator)
+    ).encode
+
+    separator = '['
+    batch = []
+    for row in rows:
+        try:
+            batch.append(encode(row))
+        except TypeError:
+            batch.append(fallback(row))
+        if len(batch) >= batch_size:
+            yield _finish(separator, batch)
+            separator = ','
+            batch = []
+    if batch:
+        yield _finish(separator, batch)
+        separator = ','
+    yield b']' if separator == ',' else b'[]'
+
+
+def _finish(separator, batch):
+    text = separator + ','.join(batch)
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def streaming_json_response(queryset, serializer, chunk_size=None):
+    """
+    Stream every row of `queryset`, as built by the `ValuesSerializer`.
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    # The rows are read after the view returns, once the database router no
+    # longer knows about the request, so pick the database now.
+    queryset = queryset.using(queryset.db)
+    rows = serializer.iter_rows(queryset, chunk_size = chunk_size)
+    return StreamingHttpResponse(iter_json_array(rows, chunk_size), content_type = 'application/json')
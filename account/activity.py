@@ -0,0 +1,102 @@
+import atexit
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+
+class ActivityTracker:
+    """
+    Collects "last seen" times of authenticated accounts in memory and
+    writes them to `Account.last_login` in batches, so recording activity
+    never adds a write to the request path.
+
+    Repeated hits from one account between two flushes collapse into one
+    timestamp. A daemon thread flushes every `flush_interval` seconds and
+    whatever is still pending is flushed when the process exits. With a
+    `flush_interval` of 0 nothing is tracked; without one it follows
+    `ACTIVITY_FLUSH_INTERVAL`, read on every use so it can be overridden.
+    """
+
+    def __init__(self, flush_interval=None, batch_size=500):
+        self._flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def flush_interval(self):
+        if self._flush_interval is None:
+            return getattr(settings, 'ACTIVITY_FLUSH_INTERVAL', 60)
+        return self._flush_interval
+
+    def touch(self, account_pk, when=None):
+        if self.flush_interval <= 0:
+            return
+        with self._lock:
+            self._pending[account_pk] = when or timezone.now()
+            if self._thread is None:
+                self._start()
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+    def flush(self):
+        """
+        Write the pending timestamps with one UPDATE per `batch_size`
+        accounts and return how many were written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            items = list(pending.items())
+            try:
+                for start in range(0, len(items), self.batch_size):
+                    batch = items[start:start + self.batch_size]
+                    get_user_model().objects.filter(pk__in = [pk for pk, _ in batch]).update(last_login = Case(
+                        *[When(pk = pk, then = Value(seen)) for pk, seen in batch],
+                        output_field = DateTimeField()
+                    ))
+            except DatabaseError:
+                # Keep what could not be written for the next flush, unless
+                # a newer hit has replaced it in the meantime.
+                with self._lock:
+                    for pk, seen in items[start:]:
+                        self._pending.setdefault(pk, seen)
+                return start
+            return len(items)
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout = self.flush_interval)
+        self.flush()
+
+    def _start(self):
+        self._thread = threading.Thread(target = self._run, name = 'activity-flush', daemon = True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+
+activity_tracker = ActivityTracker(batch_size = getattr(settings, 'ACTIVITY_FLUSH_BATCH_SIZE', 500))
@@ -0,0 +1,208 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+
+from account.activity import activity_tracker
+from account.tokens import InvalidSignedToken, SignedToken, token_denylist
+
+
+class TokenCache:
+    """
+    A thread-safe, in-process LRU cache of token key -> (account, token)
+    whose entries expire `ttl` seconds after they were stored.
+
+    Every entry remembers the account's generation in the `shared` cache,
+    which `invalidate_user` bumps, so a change made through another worker
+    turns the entry into a miss there as well.
+    """
+
+    def __init__(self, max_size=10000, ttl=300, cache_alias='shared'):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._discard(key)
+                entry = None
+        if entry is not None and entry[3] != self.shared_generation(entry[1].pk):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._discard(key)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, key, user, token, generation=None):
+        sharedGeneration = self.shared_generation(user.pk)
+        with self._lock:
+            # An invalidation arrived while the caller was reading the
+            # database, so what it read may already be stale.
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, user, token, sharedGeneration)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self.generation += 1
+            if key in self._entries:
+                self._discard(key)
+
+    def invalidate_user(self, user_pk):
+        with self._lock:
+            self.generation += 1
+            for key in self._keys_by_user.pop(user_pk, ()):
+                self._entries.pop(key, None)
+        cache = caches[self.cache_alias]
+        try:
+            cache.incr(self._generation_key(user_pk))
+        except ValueError:
+            cache.add(self._generation_key(user_pk), 1, timeout = None)
+
+    def shared_generation(self, user_pk):
+        return caches[self.cache_alias].get(self._generation_key(user_pk), 0)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+            }
+
+    def _generation_key(self, user_pk):
+        return f'token-cache-generation:{user_pk}'
+
+    def _discard(self, key):
+        user = self._entries.pop(key)[1]
+        keys = self._keys_by_user.get(user.pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user.pk]
+
+
+token_cache = TokenCache(
+    max_size = getattr(settings, 'TOKEN_CACHE_MAX_SIZE', 10000),
+    ttl = getattr(settings, 'TOKEN_CACHE_TTL', 300)
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for DRF's `TokenAuthentication` that serves repeated
+    lookups of the same token from `token_cache` instead of the database.
+    """
+
+    def authenticate(self, request):
+        result = super(CachedTokenAuthentication, self).authenticate(request)
+        if result is not None:
+            activity_tracker.touch(result[0].pk)
+        return result
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            generation = token_cache.generation
+            user, token = super(CachedTokenAuthentication, self).authenticate_credentials(key)
+            token_cache.set(key, user, token, generation)
+        else:
+            user, token = cached
+        # Hand every request its own instance so one request can't leak
+        # attribute changes into another through the cache.
+        return (copy.copy(user), token)
+
+
+def _unloaded_account(*args, **kwargs):
+    raise TypeError('Accounts authenticated by a signed token are not loaded from the database; fetch the account to change it.')
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates `Authorization: Bearer <signed token>` headers entirely
+    from the token's signature and claims, without a database lookup.
+
+    The returned account only carries the `pk`, `role` and permission flags
+    from the token; it can be compared against other accounts but its
+    remaining fields are not loaded, so it refuses to be saved or deleted.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            msg = _('Invalid token header. Token string should not contain spaces.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            value = auth[1].decode()
+        except UnicodeError:
+            msg = _('Invalid token header. Token string should not contain invalid characters.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        return self.authenticate_credentials(value)
+
+    def authenticate_credentials(self, value):
+        try:
+            token = SignedToken.parse(value)
+        except InvalidSignedToken as error:
+            raise exceptions.AuthenticationFailed(str(error))
+
+        if token_denylist.is_revoked(token):
+            raise exceptions.AuthenticationFailed(_('Token has been revoked.'))
+
+        user = get_user_model()(pk = token.user_id, role = token.role)
+        for name in SignedToken.FLAGS:
+            setattr(user, name, token.has_flag(name))
+        user._state.adding = False
+        # Saving would overwrite the row with the fields that weren't loaded.
+        user.save = user.delete = _unloaded_account
+        activity_tracker.touch(user.pk)
+        return (user, token)
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -1,8 +1,14 @@
 from django import forms
 from django.contrib.auth.forms import ReadOnlyPasswordHashField
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Q
 
 from account.models import Account
+from Magerbun_Profile.pagination import EstimatedCountChangeList, EstimatedCountPaginator
+
+# Sorts after any string a lookup column can hold that starts with a prefix,
+# so `prefix <= value < prefix + PREFIX_END` is an index range scan.
+PREFIX_END = '\U0010ffff'
 
 class UserChangeForm(forms.ModelForm):
     password = ReadOnlyPasswordHashField()
@@ -11,12 +17,55 @@ class UserChangeForm(forms.ModelForm):
         model = Account
         fields = ['email', 'username', 'password', 'passwordConfirmation', 'role', 'is_active', 'is_admin', 'is_staff', 'is_superuser']
 
+    def clean_email(self):
+        # The model form only checks `email` as typed, but `email_lookup` is
+        # unique regardless of case and would fail the save instead.
+        email = self.cleaned_data['email']
+        accounts = Account.objects.filter(email_lookup = Account.lookup_key(email))
+        if self.instance.pk is not None:
+            accounts = accounts.exclude(pk = self.instance.pk)
+        if accounts.exists():
+            modelField = Account._meta.get_field('email')
+            raise forms.ValidationError(modelField.error_messages['unique'], code = 'unique', params = {
+                'model_name': Account._meta.verbose_name,
+                'field_label': modelField.verbose_name
+            })
+        return email
+
 class AccountAdmin(BaseUserAdmin):
     form = UserChangeForm
     list_display = ('email', 'username', 'role', 'date_joined', 'last_login', 'is_admin', 'is_staff')
     search_fields = ('email', 'username')
     ordering = ('role', 'date_joined', 'email', 'username')
+    # Both filters offer their choices without a query, and filter through
+    # account_admin_order_idx / account_dagangan_order_idx in list order.
+    list_filter = ('role', 'tipeDagangan')
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) behind "(n total)".
+    show_full_result_count = False
 
     fieldsets = ()
-    list_filter = ()
-    filter_horizontal = ()
\ No newline at end of file
+    filter_horizontal = ()
+
+    def get_changelist(self, request, **kwargs):
+        return EstimatedCountChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match the start of the email or username, or with a leading `=` the
+        whole of it, ignoring case, through the indexed lookup columns. The
+        default `icontains` search has to read every row.
+        """
+        term = search_term.strip()
+        if term.startswith('='):
+            key = Account.lookup_key(term[1:].strip())
+            condition = Q(email_lookup = key) | Q(username_lookup = key)
+        else:
+            key = Account.lookup_key(term)
+            condition = (
+                Q(email_lookup__gte = key, email_lookup__lt = key + PREFIX_END)
+                | Q(username_lookup__gte = key, username_lookup__lt = key + PREFIX_END)
+            )
+        if not key:
+            return queryset, False
+        return queryset.filter(condition), False
\ No newline at end of file
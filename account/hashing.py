@@ -0,0 +1,66 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class HashingPoolFull(Exception):
+    pass
+
+
+class HashingPool:
+    """
+    A bounded thread pool for password hashing, so PBKDF2 never runs on the
+    event loop.
+
+    At most `max_workers` hashes run at once and at most `queue_limit` more
+    wait for a worker; anything beyond that is refused with `HashingPoolFull`
+    straight away instead of queueing behind the burst. hashlib releases the
+    GIL while it hashes, so threads are enough to use every core.
+    """
+
+    def __init__(self, max_workers, queue_limit):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._slots = threading.BoundedSemaphore(max_workers + queue_limit)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers = self.max_workers,
+                        thread_name_prefix = 'hashing'
+                    )
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        if not self._slots.acquire(blocking = False):
+            raise HashingPoolFull()
+
+        try:
+            future = self.executor.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._slots.release()
+            raise
+        # Free the slot when the hash actually finishes, even if the caller
+        # has gone away in the meantime.
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait = True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(
+    max_workers = getattr(settings, 'HASHING_POOL_SIZE', None) or os.cpu_count() or 1,
+    queue_limit = getattr(settings, 'HASHING_POOL_QUEUE_LIMIT', 32)
+)
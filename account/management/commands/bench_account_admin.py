@@ -0,0 +1,104 @@
+import random
+import time
+
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from account.forms import AccountAdmin
+from account.models import Account
+
+NEW_INDEXES = ('account_admin_order_idx', 'account_dagangan_order_idx')
+
+
+class DefaultAccountAdmin(AccountAdmin):
+    """
+    The changelist with Django's defaults: exact COUNT(*) of every page
+    request, the unfiltered total, and `icontains` search.
+    """
+    paginator = Paginator
+    show_full_result_count = True
+
+    def get_search_results(self, request, queryset, search_term):
+        return admin.ModelAdmin.get_search_results(self, request, queryset, search_term)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the Account admin changelist against a generated table, with '
+        'the estimated count, indexed search and filter indexes, and with '
+        'Django\'s defaults and without the filter indexes. Rows are '
+        'inserted in a transaction that is rolled back, so the database is '
+        'left as it was.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type = int, default = 200000)
+        parser.add_argument('--repeat', type = int, default = 3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.superuser = self.populate(options['accounts'])
+            self.stdout.write(f'{options["accounts"]} accounts')
+            self.stdout.write(f'{"":<28}{"tuned SQL":>12}{"total":>10}{"defaults SQL":>14}{"total":>10}')
+            timings = [self.run_cases(AccountAdmin, options['repeat'])]
+            with connection.cursor() as cursor:
+                for index in NEW_INDEXES:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(index)}')
+            timings.append(self.run_cases(DefaultAccountAdmin, options['repeat']))
+            for name, (tunedSql, tunedTotal) in timings[0].items():
+                defaultSql, defaultTotal = timings[1][name]
+                self.stdout.write(f'{name:<28}{tunedSql:>10.1f}ms{tunedTotal:>8.1f}ms{defaultSql:>12.1f}ms{defaultTotal:>8.1f}ms')
+            transaction.set_rollback(True)
+
+    def populate(self, count):
+        generator = random.Random(count)
+        passwordHash = make_password('benchpassword')
+        accounts = []
+        for index in range(count):
+            role = generator.choice(('buyer', 'seller'))
+            account = Account(
+                email = f'user{index}@yandex.com',
+                username = f'user{index}',
+                password = passwordHash,
+                role = role,
+                tipeDagangan = generator.choice([name for name, _ in Account.DAGANGAN]) if role == 'seller' else None
+            )
+            account.set_lookups()
+            accounts.append(account)
+        Account.objects.bulk_create(accounts, batch_size = 2000)
+        superuser = Account(email = 'bench.admin@yandex.com', username = 'benchadmin', role = 'seller', is_admin = True, is_staff = True, is_superuser = True)
+        superuser.set_password('benchpassword')
+        superuser.save()
+        return superuser
+
+    def run_cases(self, adminClass, repeat):
+        modelAdmin = adminClass(Account, admin.site)
+        cases = (
+            ('first page', {}),
+            ('page 200', {'p': '200'}),
+            ('search user1234', {'q': 'user1234'}),
+            ('filter role', {'role__exact': 'seller'}),
+            ('filter role + tipeDagangan', {'role__exact': 'seller', 'tipeDagangan__exact': 'jajanan'}),
+        )
+        timings = {}
+        for name, params in cases:
+            best = None
+            for _ in range(repeat):
+                request = RequestFactory().get('/admin/account/account/', params)
+                request.user = self.superuser
+                # The page's queries run while the template renders, so
+                # their time is taken from the captured queries.
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    modelAdmin.changelist_view(request).render()
+                    elapsed = time.perf_counter() - started
+                sql = sum(float(query['time']) for query in queries.captured_queries)
+                if best is None or elapsed < best[1]:
+                    best = (sql, elapsed)
+            timings[name] = (best[0] * 1000, best[1] * 1000)
+        return timings
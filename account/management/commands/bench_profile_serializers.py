@@ -0,0 +1,44 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from account.models import Account
+from account.serializers import AccountSerializer
+from account.views import PROFILE_FIELDS
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare building profile serializers with the `fields` argument '
+        'against the precompiled classes from `AccountSerializer.for_fields`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type = int, default = 2000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        account = Account(
+            pk = 1,
+            email = 'bench@yandex.com',
+            username = 'benchusername',
+            role = 'seller',
+            namaLengkap = 'Bench Mark',
+            namaPanggilan = 'Bench',
+            nomorHP = '0812345678',
+            namaToko = 'Toko Bench',
+            tipeDagangan = 'campuran'
+        )
+        fields = PROFILE_FIELDS['seller']
+        serializerClass = AccountSerializer.for_fields(fields)
+
+        cases = (
+            ('construct + .fields', lambda: AccountSerializer(account, fields = fields).fields, lambda: serializerClass(account).fields),
+            ('construct + .data', lambda: AccountSerializer(account, fields = fields).data, lambda: serializerClass(account).data),
+        )
+
+        self.stdout.write(f'{"case":<22}{"before (us)":>14}{"after (us)":>14}{"speedup":>10}')
+        for name, before, after in cases:
+            beforeTime = min(timeit.repeat(before, number = iterations, repeat = 3)) / iterations * 1e6
+            afterTime = min(timeit.repeat(after, number = iterations, repeat = 3)) / iterations * 1e6
+            self.stdout.write(f'{name:<22}{beforeTime:>14.1f}{afterTime:>14.1f}{beforeTime / afterTime:>9.1f}x')
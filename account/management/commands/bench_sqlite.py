@@ -0,0 +1,103 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from Magerbun_Profile.sqlite3.base import DatabaseWrapper
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent readers and writers against a scratch SQLite file, '
+        'once with SQLite defaults and a connection per operation, once with '
+        'the PRAGMAs and persistent connections from settings, and report '
+        'throughput and read latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type = int, default = 8)
+        parser.add_argument('--writers', type = int, default = 4)
+        parser.add_argument('--seconds', type = float, default = 3)
+        parser.add_argument('--rows', type = int, default = 10000)
+
+    def handle(self, *args, **options):
+        tuned = connection.settings_dict.get('PRAGMAS', {})
+        self.stdout.write(f'{options["readers"]} readers, {options["writers"]} writers, {options["seconds"]:g}s each')
+        self.stdout.write(f'{"":<28}{"reads/s":>10}{"writes/s":>10}{"p99 read":>12}{"errors":>8}')
+        for name, pragmas, persistent in (
+            ('defaults, reconnecting', {}, False),
+            ('tuned, persistent', tuned, True),
+        ):
+            with tempfile.TemporaryDirectory() as directory:
+                settingsDict = {**connection.settings_dict, 'NAME': os.path.join(directory, 'bench.sqlite3'), 'PRAGMAS': pragmas}
+                self.populate(settingsDict, options['rows'])
+                self.report(name, self.run(settingsDict, persistent, options))
+
+    def populate(self, settingsDict, rows):
+        database = DatabaseWrapper(settingsDict, alias = 'bench')
+        with database.cursor() as cursor:
+            cursor.execute('CREATE TABLE menu (id INTEGER PRIMARY KEY, name TEXT, stock INTEGER, category TEXT)')
+            cursor.execute('CREATE INDEX menu_category ON menu (category)')
+            cursor.executemany(
+                'INSERT INTO menu (name, stock, category) VALUES (%s, %s, %s)',
+                [(f'Menu {index}', index % 20, ('makanan', 'minuman')[index % 2]) for index in range(rows)],
+            )
+        database.close()
+
+    def run(self, settingsDict, persistent, options):
+        deadline = time.perf_counter() + options['seconds']
+        results = {'reads': 0, 'writes': 0, 'errors': 0, 'latencies': []}
+        lock = threading.Lock()
+        rows = options['rows']
+
+        def read(cursor, generator):
+            start = generator.randrange(rows)
+            cursor.execute('SELECT id, name, stock FROM menu WHERE category = %s AND id > %s ORDER BY id LIMIT 100', ('makanan', start))
+            cursor.fetchall()
+
+        def write(cursor, generator):
+            cursor.execute('UPDATE menu SET stock = stock + 1 WHERE id = %s', (generator.randrange(1, rows),))
+
+        def worker(operation, counter, seed):
+            generator = random.Random(seed)
+            database = DatabaseWrapper(settingsDict, alias = 'bench')
+            done = errors = 0
+            latencies = []
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    with database.cursor() as cursor:
+                        operation(cursor, generator)
+                    done += 1
+                except DatabaseError:
+                    errors += 1
+                if not persistent:
+                    database.close()
+                latencies.append(time.perf_counter() - started)
+            database.close()
+            with lock:
+                results[counter] += done
+                results['errors'] += errors
+                if counter == 'reads':
+                    results['latencies'].extend(latencies)
+
+        threads = [threading.Thread(target = worker, args = (read, 'reads', index)) for index in range(options['readers'])]
+        threads += [threading.Thread(target = worker, args = (write, 'writes', -index - 1)) for index in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results['seconds'] = options['seconds']
+        return results
+
+    def report(self, name, results):
+        latencies = sorted(results['latencies'])
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+        self.stdout.write(
+            f'{name:<28}{results["reads"] / results["seconds"]:>10.0f}{results["writes"] / results["seconds"]:>10.0f}'
+            f'{p99:>10.2f}ms{results["errors"]:>8}'
+        )
@@ -0,0 +1,233 @@
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from rest_framework.authtoken.models import Token
+
+from account.models import Account
+
+REQUIRED_FIELDS = ('email', 'username', 'password', 'role')
+OPTIONAL_FIELDS = ('namaLengkap', 'namaPanggilan', 'nomorInduk', 'nomorHP', 'angkatan', 'jurusan', 'namaToko', 'tipeDagangan')
+UNIQUE_FIELDS = ('email', 'username', 'nomorInduk', 'nomorHP', 'namaToko')
+# Each unique field with the column it is compared on
+UNIQUE_COLUMNS = tuple((field, Account.UNIQUE_LOOKUP_FIELDS.get(field, field)) for field in UNIQUE_FIELDS)
+
+
+def _init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Magerbun_Profile.settings')
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        'Import accounts from a CSV or JSON Lines file. Passwords are hashed '
+        'on a process pool and rows are inserted with bulk_create, one '
+        'transaction per batch, together with their API tokens.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help = 'CSV or JSONL file to import, "-" for stdin.')
+        parser.add_argument('--format', choices = ('csv', 'jsonl'), help = 'Input format. Guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type = int, default = 500)
+        parser.add_argument('--workers', type = int, default = os.cpu_count() or 1, help = 'Hashing processes, 0 hashes in this process.')
+        parser.add_argument('--report', help = 'Write the per-row error report to this CSV file instead of stderr.')
+
+    def handle(self, *args, **options):
+        inputFormat = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.ndjson')) else 'csv')
+        batchSize = options['batch_size']
+        if batchSize < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        self.errors = []
+        self.seen = {field: set() for field in UNIQUE_FIELDS}
+        imported = 0
+        started = time.perf_counter()
+
+        self.workers = options['workers']
+        pool = ProcessPoolExecutor(max_workers = self.workers, initializer = _init_worker) if self.workers > 0 else None
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline = '', encoding = 'utf-8')
+        try:
+            rows = self.read_rows(stream, inputFormat)
+            while True:
+                batch = list(itertools.islice(rows, batchSize))
+                if not batch:
+                    break
+                imported += self.import_batch(batch, pool)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        self.write_report(options['report'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} account(s), {len(self.errors)} row(s) failed '
+            f'in {elapsed:.2f}s ({imported / elapsed if elapsed else 0:.1f} rows/s)'
+        ))
+
+    def read_rows(self, stream, inputFormat):
+        if inputFormat == 'csv':
+            # Line 1 is the header.
+            for line, row in enumerate(csv.DictReader(stream), start = 2):
+                yield line, row
+            return
+
+        for line, text in enumerate(stream, start = 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as error:
+                self.errors.append((line, '', f'invalid JSON: {error}'))
+                continue
+            if not isinstance(row, dict):
+                self.errors.append((line, '', 'expected a JSON object'))
+                continue
+            yield line, row
+
+    def clean_row(self, row):
+        """
+        Validate one input row the same way registration does, minus the
+        uniqueness checks that `import_batch` runs once for the whole batch.
+        """
+        values = {key: (str(value).strip() if value is not None else '') for key, value in row.items()}
+        missing = [field for field in REQUIRED_FIELDS if not values.get(field)]
+        if missing:
+            raise ValidationError(f'missing {", ".join(missing)}')
+
+        validate_email(values['email'])
+        if ' ' in values['username']:
+            raise ValidationError('username can\'t contain any whitespace(s)')
+        if len(values['username']) > Account._meta.get_field('username').max_length:
+            raise ValidationError('username is too long')
+
+        role = values['role'].lower()
+        if role not in dict(Account.ROLE_EXISTING):
+            raise ValidationError(f'"{values["role"]}" is not a valid role')
+
+        confirmation = values.get('passwordConfirmation')
+        if confirmation and confirmation != values['password']:
+            raise ValidationError('password confirmation field didn\'t match with the password field')
+        validate_password(values['password'])
+
+        account = Account(
+            email = Account.objects.normalize_email(values['email']),
+            username = values['username'],
+            role = role
+        )
+        # bulk_create skips `save`, which fills these.
+        account.set_lookups()
+        for field in OPTIONAL_FIELDS:
+            if values.get(field):
+                setattr(account, field, values[field])
+        if account.tipeDagangan:
+            account.tipeDagangan = account.tipeDagangan.lower()
+            if account.tipeDagangan not in dict(Account.DAGANGAN):
+                raise ValidationError(f'"{account.tipeDagangan}" is not a valid tipeDagangan')
+        return account, values['password']
+
+    def import_batch(self, batch, pool):
+        candidates = []
+        for line, row in batch:
+            try:
+                account, password = self.clean_row(row)
+            except ValidationError as error:
+                self.errors.append((line, row.get('email', ''), '; '.join(error.messages)))
+                continue
+            candidates.append((line, account, password))
+
+        candidates = self.drop_duplicates(candidates)
+        if not candidates:
+            return 0
+
+        passwords = [password for _, _, password in candidates]
+        if pool is None:
+            hashes = [make_password(password) for password in passwords]
+        else:
+            hashes = list(pool.map(make_password, passwords, chunksize = max(1, len(passwords) // (self.workers * 4))))
+        accounts = []
+        for (line, account, password), passwordHash in zip(candidates, hashes):
+            account.password = passwordHash
+            accounts.append(account)
+
+        try:
+            with transaction.atomic():
+                # bulk_create skips post_save, so the tokens `create_auth_token`
+                # would have issued one by one are inserted here in bulk.
+                Account.objects.bulk_create(accounts)
+                emails = [account.email for account in accounts]
+                ids = Account.objects.filter(email__in = emails).values_list('pk', flat = True)
+                Token.objects.bulk_create([Token(key = Token.generate_key(), user_id = pk) for pk in ids])
+        except DatabaseError as error:
+            for line, account, _ in candidates:
+                self.errors.append((line, account.email, f'batch rolled back: {error}'))
+            return 0
+        # Only rows that were committed block later ones.
+        for account in accounts:
+            for field, column in UNIQUE_COLUMNS:
+                if getattr(account, column):
+                    self.seen[field].add(getattr(account, column))
+        return len(accounts)
+
+    def drop_duplicates(self, candidates):
+        """
+        Reject rows whose unique fields repeat an earlier row of the file or
+        an existing account, using a single query per batch. Emails are
+        compared through their lowercased lookup column.
+        """
+        condition = Q()
+        for field, column in UNIQUE_COLUMNS:
+            values = [getattr(account, column) for _, account, _ in candidates if getattr(account, column)]
+            if values:
+                condition |= Q(**{f'{column}__in': values})
+        existing = {field: set() for field in UNIQUE_FIELDS}
+        for row in Account.objects.filter(condition).values_list(*(column for _, column in UNIQUE_COLUMNS)):
+            for field, value in zip(UNIQUE_FIELDS, row):
+                existing[field].add(value)
+
+        # Values of this batch's earlier rows; `import_batch` adds them to
+        # `self.seen` once the batch commits.
+        batchSeen = {field: set() for field in UNIQUE_FIELDS}
+        unique = []
+        for line, account, password in candidates:
+            conflicts = [
+                field for field, column in UNIQUE_COLUMNS
+                if getattr(account, column) and (
+                    getattr(account, column) in existing[field]
+                    or getattr(account, column) in self.seen[field]
+                    or getattr(account, column) in batchSeen[field]
+                )
+            ]
+            if conflicts:
+                self.errors.append((line, account.email, f'duplicate {", ".join(conflicts)}'))
+                continue
+            for field, column in UNIQUE_COLUMNS:
+                if getattr(account, column):
+                    batchSeen[field].add(getattr(account, column))
+            unique.append((line, account, password))
+        return unique
+
+    def write_report(self, path):
+        if not self.errors:
+            return
+        stream = open(path, 'w', newline = '', encoding = 'utf-8') if path else self.stderr
+        try:
+            writer = csv.writer(stream)
+            writer.writerow(('line', 'email', 'error'))
+            writer.writerows(sorted(self.errors))
+        finally:
+            if path:
+                stream.close()
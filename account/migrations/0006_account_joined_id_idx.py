@@ -0,0 +1,17 @@
+# Generated by Django 3.2.7 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0005_alter_account_tipedagangan'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['date_joined', 'id'], name='account_joined_id_idx'),
+        ),
+    ]
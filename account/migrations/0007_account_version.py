@@ -0,0 +1,24 @@
+# Generated by Django 3.2.7 on 2026-10-18 13:27
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0006_account_joined_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='updated at'),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.7 on 2026-10-18 13:33
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_account_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='account',
+            name='last_login',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='last login'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.7 on 2026-10-18 16:02
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def fill_lookups(apps, schema_editor):
+    Account = apps.get_model('account', 'Account')
+    accounts = Account.objects.using(schema_editor.connection.alias)
+
+    # Check first, so nothing is written when the unique index on emails
+    # can't be built. Usernames may still differ only in case.
+    emails = Counter(email.lower() for email in accounts.values_list('email', flat=True).iterator(chunk_size=2000))
+    clashes = [email for email, count in emails.items() if count > 1]
+    if clashes:
+        raise RuntimeError(
+            'Accounts differ only in the case of their email, merge them first: '
+            + ', '.join(sorted(clashes))
+        )
+
+    batch = []
+    for account in accounts.only('email', 'username').order_by('pk').iterator(chunk_size=2000):
+        # Same as `Account.lookup_key`; historical models have no methods.
+        account.email_lookup = account.email.lower()
+        account.username_lookup = account.username.lower()
+        batch.append(account)
+        if len(batch) == 2000:
+            accounts.bulk_update(batch, ['email_lookup', 'username_lookup'])
+            batch = []
+    accounts.bulk_update(batch, ['email_lookup', 'username_lookup'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0008_account_last_login_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='email_lookup',
+            field=models.CharField(editable=False, max_length=254, null=True),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='username_lookup',
+            field=models.CharField(editable=False, max_length=50, null=True),
+        ),
+        migrations.RunPython(fill_lookups, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='account',
+            name='email_lookup',
+            field=models.CharField(editable=False, max_length=254, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['role', 'date_joined', 'email', 'username'], name='account_admin_order_idx'),
+        ),
+    ]
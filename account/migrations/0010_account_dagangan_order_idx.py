@@ -0,0 +1,17 @@
+# Generated by Django 3.2.7 on 2026-10-18 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0009_account_lookup_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['tipeDagangan', 'role', 'date_joined', 'email', 'username'], name='account_dagangan_order_idx'),
+        ),
+    ]
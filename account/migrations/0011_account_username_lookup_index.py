@@ -0,0 +1,18 @@
+# Generated by Django 3.2.7 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0010_account_dagangan_order_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='account',
+            name='username_lookup',
+            field=models.CharField(db_index=True, editable=False, max_length=50),
+        ),
+    ]
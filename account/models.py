@@ -1,11 +1,17 @@
-from django.db import models
+from functools import partial
+
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 
 from django.conf import settings
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from rest_framework.authtoken.models import Token
 
+from account.authentication import token_cache
+from account.tokens import token_denylist
+
 
 # Create your models here.
 class AccountManager(BaseUserManager):
@@ -43,6 +49,10 @@ class AccountManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def get_by_natural_key(self, email):
+        # Logins match the email whatever its case.
+        return self.get(email_lookup=Account.lookup_key(email))
+
 
 class Account(AbstractBaseUser):
     # Required area
@@ -74,20 +84,83 @@ class Account(AbstractBaseUser):
 
     # Add-on area
     date_joined = models.DateTimeField(verbose_name='date joined', auto_now_add=True)
-    last_login = models.DateTimeField(verbose_name='last login', auto_now=True)
+    # Kept up to date by `account.activity.activity_tracker`, not on every save.
+    last_login = models.DateTimeField(verbose_name='last login', default=timezone.now)
     is_active = models.BooleanField(default=True)
     is_admin = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
 
+    # Lowercased copies of email and username, kept up to date by `save`, so
+    # lookups ignore case and still use an index. Only emails are also
+    # unique regardless of case.
+    email_lookup = models.CharField(max_length=254, unique=True, editable=False)
+    username_lookup = models.CharField(max_length=50, db_index=True, editable=False)
+
+    # Bumped by `save` (except for saves of UNVERSIONED_FIELDS alone), for
+    # ETag / Last-Modified
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(verbose_name='updated at', default=timezone.now)
+
     objects = AccountManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'role']
+    LOOKUP_FIELDS = {'email': 'email_lookup', 'username': 'username_lookup'}
+    # The fields whose uniqueness is checked through their lookup column
+    UNIQUE_LOOKUP_FIELDS = {'email': 'email_lookup'}
+    # Not part of any representation, so saving them leaves the ETag alone
+    UNVERSIONED_FIELDS = {'last_login'}
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order of account listings
+            models.Index(fields=['date_joined', 'id'], name='account_joined_id_idx'),
+            # Admin changelist order, and its role filter through the prefix
+            models.Index(fields=['role', 'date_joined', 'email', 'username'], name='account_admin_order_idx'),
+            # The same for the admin's tipeDagangan filter
+            models.Index(fields=['tipeDagangan', 'role', 'date_joined', 'email', 'username'], name='account_dagangan_order_idx'),
+        ]
 
     def __str__(self):
         return self.email
 
+    @staticmethod
+    def lookup_key(value):
+        return value.lower()
+
+    def set_lookups(self):
+        deferred = self.get_deferred_fields()
+        for field, lookup in self.LOOKUP_FIELDS.items():
+            if field not in deferred:
+                setattr(self, lookup, self.lookup_key(getattr(self, field)))
+
+    def save(self, *args, **kwargs):
+        self.set_lookups()
+        update_fields = kwargs.get('update_fields')
+        bump = not self._state.adding and (update_fields is None or not set(update_fields) <= self.UNVERSIONED_FIELDS)
+        if update_fields is not None:
+            update_fields = set(update_fields) | {
+                lookup for field, lookup in self.LOOKUP_FIELDS.items() if field in update_fields
+            }
+            if bump:
+                update_fields |= {'version', 'updated_at'}
+            kwargs['update_fields'] = update_fields
+        if bump:
+            # Incremented in the UPDATE itself, so concurrent saves can't
+            # both write the same version.
+            previousVersion = self.version
+            self.version = models.F('version') + 1
+            self.updated_at = timezone.now()
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            if bump:
+                # Don't leave the expression behind when the save fails.
+                self.version = previousVersion
+        if bump:
+            self.refresh_from_db(fields=['version'])
+
     def has_perm(self, perm, obj=None):
         return True
 
@@ -99,3 +172,28 @@ class Account(AbstractBaseUser):
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
         Token.objects.create(user=instance)
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_cached_token(sender, instance=None, using=None, **kwargs):
+    token_cache.invalidate_key(instance.key)
+    token_cache.invalidate_user(instance.user_id)
+    # Again once committed, as other workers may cache the old rows until then.
+    transaction.on_commit(partial(token_cache.invalidate_user, instance.user_id), using = using)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_account(sender, instance=None, using=None, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+    transaction.on_commit(partial(token_cache.invalidate_user, instance.pk), using = using)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def revoke_signed_tokens_of_inactive_account(sender, instance=None, **kwargs):
+    if not instance.is_active:
+        token_denylist.revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_signed_tokens_of_deleted_account(sender, instance=None, **kwargs):
+    token_denylist.revoke_user(instance.pk)
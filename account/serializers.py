@@ -1,7 +1,15 @@
+import copy
+import time
+from contextlib import contextmanager
+
 from account.models import Account
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from django.contrib.auth.hashers import check_password
 from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Q
 
 class DynamicFieldsModelSerializer(serializers.ModelSerializer):
     """
@@ -23,136 +31,217 @@ class DynamicFieldsModelSerializer(serializers.ModelSerializer):
             for field_name in existing - allowed:
                 self.fields.pop(field_name)
 
+    @classmethod
+    def for_fields(cls, fields):
+        """
+        Return a subclass that only declares `fields`. It is built once per
+        field set and its fields are constructed once per process, instead
+        of building every field and popping the unwanted ones each time.
+        """
+        key = (cls, frozenset(fields))
+        serializer_class = _field_set_classes.get(key)
+        if serializer_class is None:
+            # Keep the field order the full serializer would have used.
+            names = tuple(name for name in cls().fields if name in key[1])
+            meta = type('Meta', (cls.Meta,), {'fields': names, 'exclude': None})
+            serializer_class = type(cls.__name__, (PrecompiledFieldsMixin, cls), {'Meta': meta})
+            _field_set_classes[key] = serializer_class
+        return serializer_class
+
+class PrecompiledFieldsMixin:
+    """
+    Builds the serializer's fields on first use and hands every later
+    instance a copy, skipping the model introspection `get_fields` does.
+    """
+    _prototype_fields = None
+
+    def get_fields(self):
+        cls = type(self)
+        if cls._prototype_fields is None:
+            cls._prototype_fields = super(PrecompiledFieldsMixin, self).get_fields()
+        return copy.deepcopy(cls._prototype_fields)
+
+_field_set_classes = {}
+
 class AccountSerializer(DynamicFieldsModelSerializer):
     
-    password = serializers.CharField(write_only = True, validators = [validate_password])
+    password = serializers.CharField(write_only = True)
     passwordConfirmation = serializers.CharField(write_only = True)
 
     class Meta:
         model = Account
-        exclude = ['date_joined', 'last_login', 'is_active', 'is_staff', 'is_admin', 'is_superuser']
+        exclude = ['date_joined', 'last_login', 'is_active', 'is_staff', 'is_admin', 'is_superuser', 'version', 'updated_at', 'email_lookup', 'username_lookup']
+
+    def build_standard_field(self, field_name, model_field):
+        # Uniqueness is checked for all fields at once in `validate`, so drop
+        # the per-field UniqueValidator (one query each) DRF would add.
+        field_class, field_kwargs = super(AccountSerializer, self).build_standard_field(field_name, model_field)
+        if 'validators' in field_kwargs:
+            field_kwargs['validators'] = [
+                validator for validator in field_kwargs['validators'] if not isinstance(validator, UniqueValidator)
+            ]
+        return field_class, field_kwargs
 
-    def save(self):
-        if ' ' in self.validated_data['username']:
+    # Checks run by `validate`, cheapest first. The first one to fail stops
+    # the rest, so a malformed payload never reaches the password policy,
+    # the database or the hasher.
+    VALIDATION_STAGES = (
+        ('syntax', 'check_syntax'),
+        ('password_policy', 'check_password_policy'),
+        ('uniqueness', 'check_uniqueness'),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super(AccountSerializer, self).__init__(*args, **kwargs)
+        # Seconds spent in each stage that ran, in the order they ran.
+        self.stage_timings = {}
+
+    @contextmanager
+    def timed_stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_timings[name] = time.perf_counter() - started
+
+    def to_internal_value(self, data):
+        self.stage_timings.clear()
+        with self.timed_stage('fields'):
+            return super(AccountSerializer, self).to_internal_value(data)
+
+    def validate(self, attrs):
+        for stage, method in self.VALIDATION_STAGES:
+            with self.timed_stage(stage):
+                getattr(self, method)(attrs)
+        return attrs
+
+    def check_syntax(self, attrs):
+        username = attrs.get('username')
+        if username and ' ' in username:
             raise serializers.ValidationError({'username': 'username can\'t contain any whitespace(s)'})
-        
+
+        if 'password' in attrs and 'passwordConfirmation' in attrs and attrs['password'] != attrs['passwordConfirmation']:
+            raise serializers.ValidationError({'passwordConfirmation': 'password confirmation field didn\'t match with the password field'})
+
+    def check_password_policy(self, attrs):
+        if not attrs.get('password'):
+            return
+        try:
+            validate_password(attrs['password'])
+        except DjangoValidationError as error:
+            raise serializers.ValidationError({'password': list(error.messages)})
+
+    def check_uniqueness(self, attrs):
+        """
+        Look every submitted unique field up in one OR-ed query and report
+        all of the conflicting ones together. Emails are compared through
+        their lowercased lookup column.
+        """
+        lookups = {
+            field.name: attrs[field.name] for field in Account._meta.fields
+            if field.unique and not field.primary_key and attrs.get(field.name) is not None
+        }
+        if not lookups:
+            return
+
+        columns = {name: Account.UNIQUE_LOOKUP_FIELDS.get(name, name) for name in lookups}
+        values = {
+            name: Account.lookup_key(value) if name in Account.UNIQUE_LOOKUP_FIELDS else value
+            for name, value in lookups.items()
+        }
+        condition = Q()
+        for name, value in values.items():
+            condition |= Q(**{columns[name]: value})
+        accounts = Account.objects.filter(condition)
+        if self.instance is not None:
+            accounts = accounts.exclude(pk = self.instance.pk)
+
+        errors = {}
+        for row in accounts.values_list(*columns.values())[:len(lookups)]:
+            for name, value in zip(lookups, row):
+                if value == values[name]:
+                    modelField = Account._meta.get_field(name)
+                    errors[name] = [modelField.error_messages['unique'] % {
+                        'model_name': Account._meta.verbose_name,
+                        'field_label': modelField.verbose_name
+                    }]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+    def save(self, password_hash = None):
+        """
+        Create the account. Callers that already hashed the password
+        elsewhere (e.g. off the event loop) pass it as `password_hash`.
+        """
         account = Account(
             email = self.validated_data['email'],
             username = self.validated_data['username'],
             role = self.validated_data['role'].lower()
         )
 
-        password = self.validated_data['password']
-        passwordConfirmation = self.validated_data['passwordConfirmation']
-
-        if password != passwordConfirmation:
-            raise serializers.ValidationError({'passwordConfirmation': 'password confirmation field didn\'t match with the password field'})
-        
-        account.set_password(password)
-        account.passwordConfirmation = passwordConfirmation
+        if password_hash is None:
+            with self.timed_stage('hashing'):
+                account.set_password(self.validated_data['password'])
+        else:
+            account.password = password_hash
+        account.passwordConfirmation = self.validated_data['passwordConfirmation']
 
         account.save()
         return account
     
-    def update(self, email):
-        account = Account.objects.get(email = email)
+    # Optional profile fields a PATCH may change, with the key and message
+    # used to reject a value that is the same as the current one.
+    PROFILE_UPDATE_RULES = (
+        ('namaLengkap', 'nama lengkap', 'The new full name still same with the previous one'),
+        ('nomorInduk', 'nomor induk', 'The new number ID still same with the previous one'),
+        ('angkatan', 'angkatan', 'The new university class still same with the previous one'),
+        ('jurusan', 'jurusan', 'The new major still same with the previous one'),
+        ('namaPanggilan', 'nama panggilan', 'The new nickname still same with the previous one'),
+        ('nomorHP', 'nomor hp', 'The new phone number still same with the previous one'),
+        ('namaToko', 'nama toko', 'The new stall name still same with the previous one'),
+        ('tipeDagangan', 'tipe dagangan', 'The new item type still same with the previous one'),
+    )
 
-        if self.validated_data.get('username') and (' ' in self.validated_data['username']):
-            raise serializers.ValidationError({'username': 'username can\'t contain any whitespace(s)'})
-        elif self.validated_data.get('username'):
-            oldUsername = account.username
-            newUsername = self.validated_data['username']
-            if oldUsername != newUsername:
-                account.username = newUsername
-                account.save()
-            else:
+    def update(self, account):
+        """
+        Apply the validated PATCH to `account`, which the view has already
+        loaded. Every rule is checked before anything is written, then the
+        changed columns are saved with a single UPDATE.
+        """
+        content = self.validated_data
+        changes = {}
+
+        username = content.get('username')
+        if username:
+            if account.username == username:
                 raise serializers.ValidationError({'username': 'The new username still same with the previous one'})
-        
-        if self.validated_data.get('password') and self.validated_data.get('passwordConfirmation'):
-            oldPassword = account.password
-            newPassword = self.validated_data['password']
-            passwordConfirmation = self.validated_data['passwordConfirmation']
-            if not check_password(newPassword, oldPassword):
-                if newPassword != passwordConfirmation:
-                    raise serializers.ValidationError({'passwordConfirmation': 'password confirmation field didn\'t match with the password field'})
-                account.set_password(newPassword)
-                account.passwordConfirmation = passwordConfirmation
-                account.save()
-            else:
-                raise serializers.ValidationError({'password': 'The new password still same with the previous one'})
+            changes['username'] = username
 
-        content = self.validated_data
+        for field, errorKey, message in self.PROFILE_UPDATE_RULES:
+            newOne = content.get(field)
+            if not newOne:
+                continue
+            if getattr(account, field) == newOne:
+                raise serializers.ValidationError({errorKey: message})
+            changes[field] = newOne.lower() if field == 'tipeDagangan' else newOne
+
+        # The password rules need a hash, so they go last. A mismatched
+        # confirmation was already rejected by `check_syntax`.
+        newPassword = content.get('password')
+        passwordConfirmation = content.get('passwordConfirmation')
+        if newPassword and passwordConfirmation:
+            with self.timed_stage('hashing'):
+                if check_password(newPassword, account.password):
+                    raise serializers.ValidationError({'password': 'The new password still same with the previous one'})
+                account.set_password(newPassword)
+            changes['password'] = account.password
+            changes['passwordConfirmation'] = passwordConfirmation
 
-        if 'namaLengkap' in content and content['namaLengkap']:
-            oldOne = account.namaLengkap
-            newOne = content['namaLengkap']
-            if oldOne != newOne:
-                account.namaLengkap = newOne
-                account.save()
-            else:
-                raise serializers.ValidationError({'nama lengkap': 'The new full name still same with the previous one'})
-        
-        if 'nomorInduk' in content and content['nomorInduk']:
-            oldOne = account.nomorInduk
-            newOne = content['nomorInduk']
-            if oldOne != newOne:
-                account.nomorInduk = newOne
-                account.save()
-            else:
-                raise serializers.ValidationError({'nomor induk': 'The new number ID still same with the previous one'})
-        
-        if 'angkatan' in content and content['angkatan']:
-            oldOne = account.angkatan
-            newOne = content['angkatan']
-            if oldOne != newOne:
-                account.angkatan = newOne
-                account.save()
-            else:
-                raise serializers.ValidationError({'angkatan': 'The new university class still same with the previous one'})
-            
-        if 'jurusan' in content and content['jurusan']:
-            oldOne = account.jurusan
-            newOne = content['jurusan']
-            if oldOne != newOne:
-                account.jurusan = newOne
-                account.save()
-            else:
-                raise serializers.ValidationError({'jurusan': 'The new major still same with the previous one'})
-        
-        if 'namaPanggilan' in content and content['namaPanggilan']:
-            oldOne = account.namaPanggilan
-            newOne = content['namaPanggilan']
-            if oldOne != newOne:
-                account.namaPanggilan = newOne
-                account.save()
-            else:
-                raise serializers.ValidationError({'nama panggilan': 'The new nickname still same with the previous one'})
-        
-        if 'nomorHP' in content and content['nomorHP']:
-            oldOne = account.nomorHP
-            newOne = content['nomorHP']
-            if oldOne != newOne:
-                account.nomorHP = newOne
-                account.save()
-            else:
-                raise serializers.ValidationError({'nomor hp': 'The new phone number still same with the previous one'})
-        
-        if 'namaToko' in content and content['namaToko']:
-            oldOne = account.namaToko
-            newOne = content['namaToko']
-            if oldOne != newOne:
-                account.namaToko = newOne
-                account.save()
-            else:
-                raise serializers.ValidationError({'nama toko': 'The new stall name still same with the previous one'})
-        
-        if 'tipeDagangan' in content and content['tipeDagangan']:
-            oldOne = account.tipeDagangan
-            newOne = content['tipeDagangan']
-            if oldOne != newOne:
-                account.tipeDagangan = newOne.lower()
-                account.save()
-            else:
-                raise serializers.ValidationError({'tipe dagangan': 'The new item type still same with the previous one'})
+        if changes:
+            # `save` bumps `version` and `updated_at`.
+            for field, value in changes.items():
+                setattr(account, field, value)
+            with transaction.atomic():
+                account.save(update_fields = list(changes))
 
         return account
\ No newline at end of file
@@ -0,0 +1,87 @@
+import datetime
+from unittest import mock
+
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from account.activity import ActivityTracker, activity_tracker
+from account.models import Account
+
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+
+class ActivityTrackerTest(TestCase):
+    def setUp(self):
+        self.tracker = ActivityTracker(flush_interval = 3600, batch_size = 2)
+        self.tracker._start = mock.Mock()
+        self.accounts = [
+            Account.objects.create_user(
+                email = f'activity{index}@yandex.com',
+                username = f'activity{index}',
+                password = 'passwordactivity',
+                role = 'buyer'
+            ) for index in range(3)
+        ]
+        self.seen = timezone.now() + datetime.timedelta(minutes = 5)
+
+    def test_repeated_hits_collapse(self):
+        account = self.accounts[0]
+        self.tracker.touch(account.pk, self.seen - datetime.timedelta(minutes = 1))
+        self.tracker.touch(account.pk, self.seen)
+        self.assertEqual(self.tracker.pending(), {account.pk: self.seen})
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.tracker.flush(), 1)
+        account.refresh_from_db()
+        self.assertEqual(account.last_login, self.seen)
+        self.assertEqual(self.tracker.pending(), {})
+
+    def test_flush_writes_one_update_per_batch(self):
+        for account in self.accounts:
+            self.tracker.touch(account.pk, self.seen)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.tracker.flush(), 3)
+        self.assertEqual(Account.objects.filter(last_login = self.seen).count(), 3)
+
+    def test_disabled_tracker_records_nothing(self):
+        tracker = ActivityTracker(flush_interval = 0)
+        tracker.touch(self.accounts[0].pk)
+        self.assertEqual(tracker.pending(), {})
+
+    def test_save_leaves_last_login_alone(self):
+        account = self.accounts[0]
+        Account.objects.filter(pk = account.pk).update(last_login = self.seen)
+        account.refresh_from_db()
+        account.namaLengkap = 'Activity Test'
+        account.save()
+        account.refresh_from_db()
+        self.assertEqual(account.last_login, self.seen)
+
+@override_settings(ACTIVITY_FLUSH_INTERVAL = 0)
+class ActivityTrackingRequestTest(APITestCase, TestCase):
+    def setUp(self):
+        self.account = Account.objects.create_user(
+            email = 'activity.request@yandex.com',
+            username = 'activityrequest',
+            password = 'passwordactivity',
+            role = 'buyer'
+        )
+        self.token = Token.objects.get(user = self.account).key
+
+    def test_tracking_follows_the_setting(self):
+        activity_tracker.touch(self.account.pk)
+        self.assertEqual(activity_tracker.pending(), {})
+        self.assertIsNone(activity_tracker._thread)
+
+        with override_settings(ACTIVITY_FLUSH_INTERVAL = 60), mock.patch.object(activity_tracker, '_start') as start:
+            activity_tracker.touch(self.account.pk)
+        start.assert_called_once_with()
+        self.assertIn(self.account.pk, activity_tracker.pending())
+        activity_tracker.clear()
+
+    def test_authenticated_request_is_tracked_without_writing(self):
+        self.client.credentials(HTTP_AUTHORIZATION = f'Token {self.token}')
+        url = reverse('account:Account Profile', kwargs = {'role': 'buyer', 'email': self.account.email})
+        with mock.patch.object(activity_tracker, 'touch') as touch, self.assertNumQueries(2):
+            self.client.get(url, format = 'json')
+        touch.assert_called_once_with(self.account.pk)
@@ -0,0 +1,104 @@
+from unittest import mock, skipUnless
+
+from django.contrib import admin
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from account.forms import AccountAdmin, UserChangeForm
+from account.models import Account
+from Magerbun_Profile.pagination import EstimatedCountPaginator
+
+class AccountAdminTest(TestCase):
+    def setUp(self):
+        self.admin = AccountAdmin(Account, admin.site)
+        self.superuser = Account.objects.create_superuser(
+            email = 'admin@yandex.com',
+            username = 'adminuser',
+            password = 'adminpassword',
+            role = 'seller'
+        )
+        for index, (email, username) in enumerate([('Budi@Yandex.com', 'budi'), ('sari@yandex.com', 'BudiSari'), ('andi@yandex.com', 'andi')]):
+            Account.objects.create_user(email = email, username = username, password = 'accountpassword', role = ('buyer', 'seller')[index % 2])
+
+    def search(self, term):
+        queryset, mayHaveDuplicates = self.admin.get_search_results(None, Account.objects.all(), term)
+        self.assertFalse(mayHaveDuplicates)
+        return sorted(queryset.values_list('username', flat = True))
+
+    def test_search_matches_prefixes_ignoring_case(self):
+        self.assertEqual(self.search('BUDI'), ['BudiSari', 'budi'])
+        self.assertEqual(self.search('sari@'), ['BudiSari'])
+        # Not anchored at the start, so no match.
+        self.assertEqual(self.search('yandex'), [])
+        self.assertEqual(len(self.search('  ')), 4)
+
+    def test_form_rejects_case_variants_of_taken_emails(self):
+        account = Account.objects.get(username = 'andi')
+        data = {'email': 'BUDI@yandex.com', 'username': 'andi', 'passwordConfirmation': 'x', 'role': 'buyer', 'is_active': True}
+        form = UserChangeForm(data, instance = account)
+        form.is_valid()
+        self.assertEqual(form.errors.as_data()['email'][0].code, 'unique')
+
+        # Its own email, in another case, is fine.
+        form = UserChangeForm({**data, 'email': 'Andi@Yandex.com'}, instance = account)
+        form.is_valid()
+        self.assertNotIn('email', form.errors)
+
+    def test_search_with_equals_matches_whole_values(self):
+        self.assertEqual(self.search('=budi'), ['budi'])
+        self.assertEqual(self.search('=ANDI@yandex.com'), ['andi'])
+        self.assertEqual(self.search('=bud'), [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is SQLite\'s')
+    def test_search_and_filters_use_indexes(self):
+        queryset, _ = self.admin.get_search_results(None, Account.objects.all(), 'budi')
+        plan = queryset.explain()
+        self.assertIn('(email_lookup>? AND email_lookup<?)', plan)
+        self.assertIn('(username_lookup>? AND username_lookup<?)', plan)
+
+        ordered = Account.objects.order_by(*self.admin.ordering)
+        plan = ordered.filter(tipeDagangan = 'makanan', role = 'seller').explain()
+        self.assertIn('USING INDEX account_dagangan_order_idx (tipeDagangan=? AND role=?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_paginator_estimates_unfiltered_counts(self):
+        queryset = Account.objects.order_by('pk')
+        with mock.patch.object(EstimatedCountPaginator, 'estimate_above', 1):
+            self.assertEqual(EstimatedCountPaginator(queryset, 2).count, Account.objects.order_by('-pk').first().pk)
+            # Filtered querysets are counted exactly.
+            self.assertEqual(EstimatedCountPaginator(queryset.filter(role = 'buyer'), 2).count, 2)
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 4)
+
+    def test_pages_past_the_real_end_of_an_estimate_are_clamped(self):
+        for index in range(6):
+            Account.objects.create_user(email = f'extra{index}@yandex.com', username = f'extra{index}', password = 'accountpassword', role = 'buyer')
+        # Deleting from the middle leaves MAX(rowid) where it was.
+        Account.objects.filter(pk__in = Account.objects.order_by('pk').values_list('pk', flat = True)[:6]).delete()
+        queryset = Account.objects.order_by('pk')
+        with mock.patch.object(EstimatedCountPaginator, 'estimate_above', 1):
+            paginator = EstimatedCountPaginator(queryset, 2)
+            self.assertGreater(paginator.num_pages, 2)
+            page = paginator.page(paginator.num_pages)
+            self.assertEqual((paginator.count, paginator.num_pages, page.number), (4, 2, 2))
+            self.assertEqual(list(page.object_list), list(queryset[2:]))
+
+            # And the admin shows that page instead of its error page.
+            self.client.force_login(Account.objects.create_superuser(email = 'admin2@yandex.com', username = 'adminuser2', password = 'adminpassword', role = 'seller'))
+            with mock.patch.object(AccountAdmin, 'list_per_page', 2):
+                response = self.client.get(reverse('admin:account_account_changelist'), {'p': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+
+    def test_changelist_filters_and_searches(self):
+        self.client.force_login(self.superuser)
+        url = reverse('admin:account_account_changelist')
+
+        response = self.client.get(url, {'role__exact': 'buyer', 'q': 'budi'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([account.username for account in response.context['cl'].result_list], ['budi'])
+        self.assertIsNone(response.context['cl'].full_result_count)
+
+        response = self.client.get(url, {'tipeDagangan__exact': 'makanan'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 0)
@@ -0,0 +1,210 @@
+from unittest import mock
+
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from account.models import Account
+from account.tokens import SignedToken, TokenDenylist, token_denylist
+from account.authentication import CachedTokenAuthentication, SignedTokenAuthentication, TokenCache, token_cache
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.authtoken.models import Token
+
+class CachedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.account = Account.objects.create_user(
+            email = 'cache.test@yandex.com',
+            username = 'cachetest',
+            password = 'passwordcachetest',
+            role = 'buyer'
+        )
+        self.token = Token.objects.get(user = self.account).key
+        self.authentication = CachedTokenAuthentication()
+
+    def test_repeated_lookup_is_served_from_cache(self):
+        with self.assertNumQueries(1):
+            user, token = self.authentication.authenticate_credentials(self.token)
+        with self.assertNumQueries(0):
+            cachedUser, cachedToken = self.authentication.authenticate_credentials(self.token)
+
+        self.assertEqual(cachedUser, self.account)
+        self.assertEqual(cachedToken.key, self.token)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_requests_get_their_own_account_instance(self):
+        user, _ = self.authentication.authenticate_credentials(self.token)
+        user.username = 'changedbyrequest'
+
+        cachedUser, _ = self.authentication.authenticate_credentials(self.token)
+        self.assertEqual(cachedUser.username, 'cachetest')
+
+    def test_deactivated_account_is_rejected(self):
+        self.authentication.authenticate_credentials(self.token)
+
+        self.account.is_active = False
+        self.account.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token)
+
+    def test_changes_reach_other_workers_once_committed(self):
+        otherWorker = TokenCache(ttl = 60)
+        with self.captureOnCommitCallbacks(execute = True):
+            self.account.is_active = False
+            self.account.save()
+            # Read before the change committed, so still active.
+            otherWorker.set(self.token, Account.objects.get(pk = self.account.pk), None)
+        self.assertIsNone(otherWorker.get(self.token))
+
+    def test_deleted_token_is_rejected(self):
+        self.authentication.authenticate_credentials(self.token)
+
+        Token.objects.filter(key = self.token).delete()
+        Token.objects.get_or_create(user = self.account)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token)
+
+
+class TokenCacheTest(TestCase):
+    def setUp(self):
+        self.account = Account(pk = 1, email = 'lru.test@yandex.com')
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TokenCache(max_size = 2, ttl = 60)
+        cache.set('first', self.account, None)
+        cache.set('second', self.account, None)
+        cache.get('first')
+        cache.set('third', self.account, None)
+
+        self.assertIsNotNone(cache.get('first'))
+        self.assertIsNone(cache.get('second'))
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_expired_entry_is_a_miss(self):
+        cache = TokenCache(max_size = 2, ttl = 0)
+        cache.set('first', self.account, None)
+
+        self.assertIsNone(cache.get('first'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_entry_read_before_invalidation_is_not_stored(self):
+        cache = TokenCache(max_size = 2, ttl = 60)
+        generation = cache.generation
+        cache.invalidate_user(self.account.pk)
+        cache.set('first', self.account, None, generation)
+
+        self.assertIsNone(cache.get('first'))
+
+    def test_invalidation_reaches_other_workers(self):
+        cache = TokenCache(max_size = 2, ttl = 60)
+        cache.set('first', self.account, None)
+        TokenCache().invalidate_user(self.account.pk)
+
+        self.assertIsNone(cache.get('first'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+
+@override_settings(ACTIVITY_FLUSH_INTERVAL = 0)
+class SignedTokenAuthenticationTest(APITestCase, TestCase):
+    def setUp(self):
+        token_denylist.clear()
+        self.data = {
+            'email': 'signed.test@yandex.com',
+            'username': 'signedtest',
+            'password': 'passwordsignedtest',
+            'role': 'buyer'
+        }
+        self.account = Account.objects.create_user(**self.data)
+        self.authentication = SignedTokenAuthentication()
+
+    def login(self, **extra):
+        url = reverse('account:Account Login')
+        data = {'username': self.data['email'], 'password': self.data['password'], **extra}
+        return self.client.post(url, data, format = 'json')
+
+    def test_login_issues_database_token_by_default(self):
+        response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'token': Token.objects.get(user = self.account).key})
+
+    def test_login_issues_signed_token_on_request(self):
+        response = self.login(token_type = 'signed')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['token_type'], 'Bearer')
+
+        self.client.credentials(HTTP_AUTHORIZATION = f'Bearer {response.data["token"]}')
+        url = reverse('account:Account Profile', kwargs = {'role': 'buyer', 'email': self.data['email']})
+        response = self.client.get(url, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], self.data['username'])
+
+    def test_signed_token_is_verified_without_queries(self):
+        token = str(SignedToken.issue(self.account))
+        with self.assertNumQueries(0):
+            user, claims = self.authentication.authenticate_credentials(token)
+        self.assertEqual(user, self.account)
+        self.assertEqual(claims.role, 'buyer')
+
+    def test_signed_token_carries_admin_flags(self):
+        self.account.is_staff = True
+        user, _ = self.authentication.authenticate_credentials(str(SignedToken.issue(self.account)))
+        self.assertTrue(user.is_staff)
+        self.assertFalse(user.is_superuser)
+        with self.assertRaises(TypeError):
+            user.save()
+
+        self.client.credentials(HTTP_AUTHORIZATION = f'Bearer {SignedToken.issue(self.account)}')
+        self.assertEqual(self.client.get(reverse('menu_api:Menu Cache Stats')).status_code, status.HTTP_200_OK)
+
+    def test_tampered_signed_token_is_rejected(self):
+        token = str(SignedToken.issue(self.account)).replace('.buyer.', '.seller.')
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(token)
+
+    def test_expired_signed_token_is_rejected(self):
+        token = str(SignedToken.issue(self.account, ttl = -1))
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(token)
+
+    def test_logout_revokes_signed_token(self):
+        token = self.login(token_type = 'signed').data['token']
+        self.client.credentials(HTTP_AUTHORIZATION = f'Bearer {token}')
+
+        response = self.client.post(reverse('account:Account Logout'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(token)
+
+    def test_revocations_reach_other_workers(self):
+        token = SignedToken.issue(self.account)
+        TokenDenylist().revoke(token)
+        # Another worker's denylist, with nothing in memory.
+        self.assertTrue(TokenDenylist().is_revoked(token))
+        self.assertFalse(TokenDenylist().is_revoked(SignedToken.issue(self.account)))
+
+        other = SignedToken.issue(self.account)
+        TokenDenylist().revoke_user(self.account.pk)
+        self.assertTrue(TokenDenylist().is_revoked(other))
+
+    def test_tokens_issued_right_after_revoking_the_account_work(self):
+        before = SignedToken.issue(self.account)
+        with mock.patch('account.tokens.time.time', return_value = before.issued_at / 1000 + 0.0004):
+            token_denylist.revoke_user(self.account.pk)
+        with mock.patch('account.tokens.time.time', return_value = before.issued_at / 1000 + 0.0015):
+            after = SignedToken.issue(self.account)
+        # Both issued within the same second as the revocation.
+        self.assertTrue(token_denylist.is_revoked(before))
+        self.assertFalse(token_denylist.is_revoked(after))
+
+    def test_deactivated_account_signed_tokens_are_revoked(self):
+        token = str(SignedToken.issue(self.account))
+
+        self.account.is_active = False
+        self.account.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(token)
@@ -0,0 +1,92 @@
+import os
+import json
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.test import TestCase
+from django.core.management import call_command
+from django.db import DatabaseError
+from account.models import Account
+
+from rest_framework.authtoken.models import Token
+
+class ImportAccountsCommandTest(TestCase):
+    def setUp(self):
+        Account.objects.create_user(
+            email = 'existing@yandex.com',
+            username = 'existingusername',
+            password = 'existingpassword',
+            role = 'buyer'
+        )
+
+    def write_file(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix = suffix)
+        with os.fdopen(handle, 'w') as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_command(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_accounts', path, '--workers', '0', *args, stdout = out, stderr = err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv_creates_accounts_and_tokens(self):
+        path = self.write_file('.csv', '\n'.join([
+            'email,username,password,passwordConfirmation,role,namaToko',
+            'first@yandex.com,firstusername,firstpassword,firstpassword,buyer,',
+            'second@yandex.com,secondusername,secondpassword,,Seller,Toko Kedua',
+        ]))
+        out, err = self.run_command(path)
+
+        self.assertIn('Imported 2 account(s), 0 row(s) failed', out)
+        self.assertIn('rows/s', out)
+        seller = Account.objects.get(email = 'second@yandex.com')
+        self.assertEqual(seller.role, 'seller')
+        self.assertEqual(seller.namaToko, 'Toko Kedua')
+        self.assertEqual(Account.objects.get_by_natural_key('Second@Yandex.com'), seller)
+        self.assertTrue(seller.check_password('secondpassword'))
+        self.assertTrue(Token.objects.filter(user = seller).exists())
+        self.assertEqual(Token.objects.count(), 3)
+
+    def test_import_reports_invalid_rows(self):
+        path = self.write_file('.jsonl', '\n'.join([
+            json.dumps({'email': 'Existing@yandex.com', 'username': 'another', 'password': 'anotherpassword', 'role': 'buyer'}),
+            json.dumps({'email': 'valid@yandex.com', 'username': 'validusername', 'password': 'validpassword', 'role': 'buyer'}),
+            json.dumps({'email': 'valid.again@yandex.com', 'username': 'validusername', 'password': 'validpassword', 'role': 'buyer'}),
+            json.dumps({'email': 'role@yandex.com', 'username': 'roleusername', 'password': 'rolepassword', 'role': 'admin'}),
+            json.dumps({'email': 'space@yandex.com', 'username': 'space username', 'password': 'spacepassword', 'role': 'buyer'}),
+            'not json',
+        ]))
+        out, err = self.run_command(path, '--batch-size', '2')
+
+        self.assertIn('Imported 1 account(s), 5 row(s) failed', out)
+        self.assertTrue(Account.objects.filter(email = 'valid@yandex.com').exists())
+        report = err.splitlines()
+        self.assertEqual(report[0], 'line,email,error')
+        self.assertEqual([line.split(',')[0] for line in report[1:]], ['1', '3', '4', '5', '6'])
+        self.assertIn('duplicate email', report[1])
+        self.assertIn('duplicate username', report[2])
+
+    def test_rows_of_a_rolled_back_batch_can_be_imported_later(self):
+        path = self.write_file('.jsonl', '\n'.join([
+            json.dumps({'email': 'retry@yandex.com', 'username': 'retryusername', 'password': 'retrypassword', 'role': 'buyer'}),
+            json.dumps({'email': 'retry@yandex.com', 'username': 'retryusername', 'password': 'retrypassword', 'role': 'buyer'}),
+        ]))
+        bulkCreate = Token.objects.bulk_create
+        calls = []
+
+        def failFirstBatch(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise DatabaseError('disk I/O error')
+            return bulkCreate(*args, **kwargs)
+
+        with mock.patch.object(Token.objects, 'bulk_create', side_effect = failFirstBatch):
+            out, err = self.run_command(path, '--batch-size', '1')
+
+        self.assertIn('Imported 1 account(s), 1 row(s) failed', out)
+        self.assertIn('batch rolled back', err)
+        self.assertTrue(Account.objects.filter(email = 'retry@yandex.com').exists())
+
@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase
+
+from Magerbun_Profile.sqlite3.base import DatabaseWrapper, pragma_statements
+
+class SQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settingsDict = {
+            **connection.settings_dict,
+            'NAME': os.path.join(directory.name, 'tuned.sqlite3'),
+            'CONN_HEALTH_CHECKS': True,
+            'PRAGMAS': {'journal_mode': 'wal', 'synchronous': 'normal', 'cache_size': -2000, 'busy_timeout': 1234},
+        }
+        self.database = DatabaseWrapper(self.settingsDict, alias = 'tuned')
+        self.addCleanup(self.database.close)
+
+    def pragma(self, name):
+        with self.database.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        # 1 is NORMAL.
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -2000)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    def test_pragmas_are_validated(self):
+        self.assertEqual(pragma_statements({'mmap_size': 0}), ['PRAGMA mmap_size = 0'])
+        with self.assertRaises(ImproperlyConfigured):
+            pragma_statements({'journal_mode': 'wal; DROP TABLE account_account'})
+        with self.assertRaises(ImproperlyConfigured):
+            pragma_statements({'journal mode': 'wal'})
+
+    def test_broken_connections_are_replaced(self):
+        self.database.ensure_connection()
+        self.assertTrue(self.database.is_usable())
+        self.database.close_if_unusable_or_obsolete()
+        self.assertIsNotNone(self.database.connection)
+
+        self.database.connection.close()
+        self.assertFalse(self.database.is_usable())
+        self.database.close_if_unusable_or_obsolete()
+        self.assertIsNone(self.database.connection)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
@@ -1,3 +1,8 @@
+import importlib
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.db import DatabaseError, connection
 from django.test import TestCase
 from account.models import Account, AccountManager
 
@@ -67,4 +72,85 @@ class AccountModelTest(TestCase):
     def test_account_name_formatting(self):
         account = Account.objects.get(email = 'account.test@yandex.com')
         expected_object_name = f'{account.email}'
-        self.assertEqual(str(account), expected_object_name)
\ No newline at end of file
+        self.assertEqual(str(account), expected_object_name)
+
+    def test_lookup_columns_follow_email_and_username(self):
+        account = Account.objects.create_user(
+            email = 'Mixed.Case@Yandex.com',
+            username = 'MixedCase',
+            password = self.testPassword,
+            role = self.testRole
+        )
+        self.assertEqual((account.email_lookup, account.username_lookup), ('mixed.case@yandex.com', 'mixedcase'))
+
+        account.username = 'NewName'
+        account.save(update_fields = ['username'])
+        account.refresh_from_db()
+        self.assertEqual(account.username_lookup, 'newname')
+        self.assertEqual(Account.objects.get_by_natural_key('MIXED.case@yandex.com'), account)
+
+    def test_every_save_bumps_the_version(self):
+        account = Account.objects.get(email = 'account.test@yandex.com')
+        stale = Account.objects.get(email = 'account.test@yandex.com')
+
+        account.namaLengkap = 'Account Test'
+        account.save()
+        stale.jurusan = 'Ilmu Kodok'
+        stale.save(update_fields = ['jurusan'])
+        self.assertEqual((account.version, stale.version), (2, 3))
+
+        stale.save(update_fields = ['last_login'])
+        self.assertEqual(Account.objects.get(pk = stale.pk).version, 3)
+
+    def test_failed_save_keeps_the_version(self):
+        account = Account.objects.get(email = 'account.test@yandex.com')
+        with mock.patch('django.contrib.auth.base_user.AbstractBaseUser.save', side_effect = DatabaseError):
+            with self.assertRaises(DatabaseError):
+                account.save()
+        self.assertEqual(account.version, 1)
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is SQLite\'s')
+class FillLookupsMigrationTest(TestCase):
+    def setUp(self):
+        self.fillLookups = importlib.import_module('account.migrations.0009_account_lookup_fields').fill_lookups
+        self.first = Account.objects.create_user(email = 'same@yandex.com', username = 'first', password = 'passwordfirst', role = 'buyer')
+        # A username spelled like another account's email is no clash.
+        self.second = Account.objects.create_user(email = 'second@yandex.com', username = 'Same@yandex.com', password = 'passwordsecond', role = 'buyer')
+        # The columns are NOT NULL now, so mark them stale instead of empty.
+        for account in Account.objects.all():
+            Account.objects.filter(pk = account.pk).update(email_lookup = f'stale{account.pk}', username_lookup = f'stale{account.pk}')
+
+    def fill(self):
+        self.fillLookups(apps, mock.Mock(connection = connection))
+
+    def test_lookups_are_filled(self):
+        self.fill()
+        self.second.refresh_from_db()
+        self.assertEqual((self.second.email_lookup, self.second.username_lookup), ('second@yandex.com', 'same@yandex.com'))
+
+    def test_clashes_are_refused_before_anything_is_written(self):
+        Account.objects.filter(pk = self.second.pk).update(email = 'SAME@yandex.com')
+        with self.assertRaisesMessage(RuntimeError, 'same@yandex.com'):
+            self.fill()
+        self.assertFalse(Account.objects.exclude(email_lookup__startswith = 'stale').exists())
+
+    def test_usernames_may_differ_only_in_case(self):
+        Account.objects.filter(pk = self.second.pk).update(username = 'FIRST')
+        self.fill()
+        self.assertEqual(Account.objects.filter(username_lookup = 'first').count(), 2)
+
+class AccountIndexTest(TestCase):
+    def test_email_lookup_uses_an_index(self):
+        plan = Account.objects.filter(email_lookup = Account.lookup_key('Someone@Yandex.com')).explain()
+        self.assertIn('USING INDEX', plan)
+        self.assertIn('(email_lookup=?)', plan)
+
+    def test_admin_order_and_role_filter_use_the_composite_index(self):
+        ordering = ('role', 'date_joined', 'email', 'username')
+        plan = Account.objects.order_by(*ordering).explain()
+        self.assertIn('USING INDEX account_admin_order_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        plan = Account.objects.filter(role = 'seller').order_by(*ordering).explain()
+        self.assertIn('USING INDEX account_admin_order_idx (role=?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
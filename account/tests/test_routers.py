@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from account.models import Account
+from Magerbun_Profile.routers import STICKY_CACHE, STICKY_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware
+from Magerbun_Profile.streaming import streaming_json_response
+
+# Stands in for the shared cache, as these tests don't touch the database.
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    STICKY_CACHE: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sticky'},
+}
+
+@override_settings(REPLICA_DATABASES = ['replica1', 'replica2'], REPLICA_STICKY_SECONDS = 5, CACHES = SHARED_CACHES)
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        caches[STICKY_CACHE].clear()
+        self.addCleanup(caches[STICKY_CACHE].clear)
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.middleware = ReplicaRoutingMiddleware(self.readAlias)
+
+    def readAlias(self, request):
+        return HttpResponse(self.router.db_for_read(Account))
+
+    def route(self, method, **extra):
+        return self.middleware(getattr(self.factory, method)('/api/account/', **extra))
+
+    def test_safe_methods_read_from_replicas(self):
+        self.assertIn(self.route('get').content, (b'replica1', b'replica2'))
+        self.assertEqual(self.route('post').content, b'default')
+        self.assertEqual(self.router.db_for_write(Account), 'default')
+
+    def test_the_database_cache_is_read_from_the_primary(self):
+        cacheModel = DatabaseCache('django_cache', {}).cache_model_class
+        middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse(self.router.db_for_read(cacheModel)))
+        self.assertEqual(middleware(self.factory.get('/api/account/')).content, b'default')
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Account), 'default')
+
+    def test_reads_in_a_transaction_use_the_primary(self):
+        with mock.patch.object(connection, 'in_atomic_block', True):
+            self.assertEqual(self.route('get').content, b'default')
+
+    def test_writers_stick_to_the_primary_by_token(self):
+        with mock.patch('Magerbun_Profile.routers.time.time', return_value = 1000.0):
+            self.route('patch', HTTP_AUTHORIZATION = 'Token abc')
+            self.assertEqual(self.route('get', HTTP_AUTHORIZATION = 'Token abc').content, b'default')
+            self.assertNotEqual(self.route('get', HTTP_AUTHORIZATION = 'Token xyz').content, b'default')
+
+        with mock.patch('Magerbun_Profile.routers.time.time', return_value = 1006.0):
+            self.assertNotEqual(self.route('get', HTTP_AUTHORIZATION = 'Token abc').content, b'default')
+
+    def test_writers_stick_to_the_primary_by_cookie(self):
+        with mock.patch('Magerbun_Profile.routers.time.time', return_value = 1000.0):
+            response = self.route('post')
+            cookie = response.cookies[STICKY_COOKIE]
+            self.assertEqual(cookie['max-age'], 5)
+
+            self.factory.cookies[STICKY_COOKIE] = cookie.value
+            self.assertEqual(self.route('get').content, b'default')
+            self.factory.cookies[STICKY_COOKIE] = 'garbage'
+            self.assertNotEqual(self.route('get').content, b'default')
+
+    def test_cache_failures_read_from_the_primary(self):
+        with mock.patch.object(caches[STICKY_CACHE], 'get', side_effect = OSError), mock.patch.object(caches[STICKY_CACHE], 'set', side_effect = OSError):
+            self.assertEqual(self.route('patch', HTTP_AUTHORIZATION = 'Token abc').status_code, 200)
+            self.assertEqual(self.route('get', HTTP_AUTHORIZATION = 'Token abc').content, b'default')
+
+    def test_streamed_rows_keep_the_request_database(self):
+        readFrom = []
+
+        class Rows:
+            def iter_rows(self, queryset, chunk_size = None):
+                # Runs only once the response is iterated.
+                readFrom.append(queryset.db)
+                yield from ()
+
+        middleware = ReplicaRoutingMiddleware(lambda request: streaming_json_response(Account.objects.all(), Rows()))
+        response = middleware(self.factory.get('/api/account/'))
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+        self.assertIn(readFrom[0], ('replica1', 'replica2'))
+
+    @override_settings(REPLICA_DATABASES = [])
+    def test_without_replicas_nothing_changes(self):
+        response = self.route('post')
+        self.assertEqual(response.content, b'default')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.test import TestCase
+from account.models import Account
+from account.serializers import AccountSerializer
+from account.views import PROFILE_FIELDS, PROFILE_UPDATE_FIELDS
+from Magerbun_Profile.serialization import FastJSONRenderer, ValuesSerializer
+
+from rest_framework.renderers import JSONRenderer
+
+class AccountSerializerForFieldsTest(TestCase):
+    def setUp(self):
+        self.account = Account(
+            pk = 1,
+            email = 'serializer.test@yandex.com',
+            username = 'serializertest',
+            role = 'seller',
+            namaToko = 'Toko Serializer',
+            tipeDagangan = 'campuran'
+        )
+
+    def test_serializer_class_is_built_once_per_field_set(self):
+        fields = PROFILE_FIELDS['seller']
+        self.assertIs(AccountSerializer.for_fields(fields), AccountSerializer.for_fields(tuple(reversed(fields))))
+        self.assertIsNot(AccountSerializer.for_fields(fields), AccountSerializer.for_fields(PROFILE_FIELDS['buyer']))
+
+    def test_output_matches_dynamic_fields(self):
+        for fields in (*PROFILE_FIELDS.values(), *PROFILE_UPDATE_FIELDS.values()):
+            expected = AccountSerializer(self.account, fields = fields).data
+            data = AccountSerializer.for_fields(fields)(self.account).data
+            self.assertEqual(list(data.items()), list(expected.items()))
+
+    def test_instances_do_not_share_fields(self):
+        serializerClass = AccountSerializer.for_fields(PROFILE_UPDATE_FIELDS['buyer'])
+        first = serializerClass(self.account)
+        second = serializerClass(self.account)
+        self.assertIsNot(first.fields['username'], second.fields['username'])
+        self.assertIs(first.fields['username'].parent, first)
+
+
+class AccountValuesSerializerTest(TestCase):
+    def setUp(self):
+        Account.objects.create_user(
+            email = 'values.test@yandex.com',
+            username = 'valuestest',
+            password = 'passwordvaluestest',
+            role = 'buyer'
+        )
+        account = Account.objects.create_user(
+            email = 'values.seller@yandex.com',
+            username = 'valuesseller',
+            password = 'passwordvaluesseller',
+            role = 'seller'
+        )
+        account.namaToko = 'Warung é\u2028'
+        account.tipeDagangan = 'campuran'
+        account.save()
+
+    def test_output_is_byte_compatible_with_account_serializer(self):
+        accounts = Account.objects.order_by('pk')
+        expected = JSONRenderer().render(AccountSerializer(accounts, many = True).data)
+        rendered = FastJSONRenderer().render(ValuesSerializer(AccountSerializer).rows(accounts))
+        self.assertEqual(rendered, expected)
+
+class AccountSerializerStagesTest(TestCase):
+    def setUp(self):
+        self.existing = Account.objects.create_user(
+            email = 'stages.existing@yandex.com',
+            username = 'stagesexisting',
+            password = 'stagespassword',
+            role = 'buyer'
+        )
+        self.data = {
+            'email': 'stages.new@yandex.com',
+            'username': 'stagesnew',
+            'password': 'stagespassword',
+            'passwordConfirmation': 'stagespassword',
+            'role': 'buyer'
+        }
+
+    def test_cross_field_errors_skip_policy_and_database(self):
+        data = dict(self.data, email = self.existing.email, password = 'password')
+        serializer = AccountSerializer(data = data)
+        with mock.patch('account.serializers.validate_password') as validatePassword, self.assertNumQueries(0):
+            self.assertFalse(serializer.is_valid())
+        validatePassword.assert_not_called()
+        self.assertEqual(list(serializer.errors), ['passwordConfirmation'])
+        self.assertEqual(list(serializer.stage_timings), ['fields', 'syntax'])
+
+    def test_password_policy_errors_skip_database(self):
+        data = dict(self.data, email = self.existing.email, password = 'password', passwordConfirmation = 'password')
+        serializer = AccountSerializer(data = data)
+        with self.assertNumQueries(0):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(list(serializer.errors), ['password'])
+        self.assertEqual(list(serializer.stage_timings), ['fields', 'syntax', 'password_policy'])
+
+    def test_every_stage_is_timed_for_a_valid_payload(self):
+        serializer = AccountSerializer(data = self.data)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        self.assertEqual(list(serializer.stage_timings), ['fields', 'syntax', 'password_policy', 'uniqueness', 'hashing'])
+        self.assertTrue(all(seconds >= 0 for seconds in serializer.stage_timings.values()))
@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.urls import reverse
+from django.test import TestCase
+from account.models import Account
+from account.throttling import SlidingWindowLimiter, login_email_limiter, login_ip_limiter
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+class FakeClock:
+    def __init__(self, now = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class SlidingWindowLimiterTest(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = SlidingWindowLimiter(limit = 3, window = 10, max_keys = 2, clock = self.clock)
+
+    def test_hits_over_the_limit_are_refused(self):
+        self.assertEqual([self.limiter.hit('a') for _ in range(3)], [0, 0, 0])
+        self.assertGreater(self.limiter.hit('a'), 0)
+        self.assertEqual(self.limiter.hit('b'), 0)
+        self.assertEqual(self.limiter.stats()['rejected'], 1)
+
+    def test_previous_window_fades_out(self):
+        for _ in range(3):
+            self.limiter.hit('a')
+        # Half of the previous window still overlaps: 3 * 0.5 + 1 <= 3.
+        self.clock.now += 15
+        self.assertEqual(self.limiter.hit('a'), 0)
+        self.assertGreater(self.limiter.hit('a'), 0)
+        self.clock.now += 10
+        self.assertEqual(self.limiter.hit('a'), 0)
+
+    def test_wait_is_long_enough(self):
+        for _ in range(3):
+            self.limiter.hit('a')
+        self.clock.now += self.limiter.hit('a')
+        self.assertEqual(self.limiter.hit('a'), 0)
+
+    def test_tracked_keys_are_bounded(self):
+        for key in ('a', 'b', 'c'):
+            self.limiter.hit(key)
+        self.assertEqual(self.limiter.stats()['keys'], 2)
+
+        self.clock.now += 30
+        self.limiter.hit('d')
+        self.assertEqual(self.limiter.stats()['keys'], 1)
+
+class LoginThrottleTests(APITestCase, TestCase):
+    def setUp(self):
+        login_ip_limiter.clear()
+        login_email_limiter.clear()
+        self.data = {
+            'email': 'throttle.test@yandex.com',
+            'username': 'throttletest',
+            'password': 'passwordthrottletest',
+            'role': 'buyer'
+        }
+        Account.objects.create_user(**self.data)
+        self.credentials = {'username': self.data['email'], 'password': 'wrongpassword'}
+
+    def tearDown(self):
+        login_ip_limiter.clear()
+        login_email_limiter.clear()
+
+    def test_login_is_throttled_per_email_before_hashing(self):
+        url = reverse('account:Account Login')
+        with mock.patch.object(login_email_limiter, 'limit', 2):
+            for _ in range(2):
+                response = self.client.post(url, self.credentials, format = 'json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+            with mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.verify') as verify:
+                credentials = dict(self.credentials, username = self.data['email'].upper())
+                response = self.client.post(url, credentials, format = 'json')
+            verify.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    def test_login_is_throttled_per_ip(self):
+        url = reverse('account:Account Login')
+        with mock.patch.object(login_ip_limiter, 'limit', 1):
+            self.client.post(url, self.credentials, format = 'json')
+            response = self.client.post(url, dict(self.credentials, username = 'another@yandex.com'), format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_forwarded_for_does_not_dodge_the_ip_limit(self):
+        url = reverse('account:Account Login')
+        with mock.patch.object(login_ip_limiter, 'limit', 1):
+            self.client.post(url, self.credentials, format = 'json', HTTP_X_FORWARDED_FOR = '10.0.0.1')
+            response = self.client.post(url, self.credentials, format = 'json', HTTP_X_FORWARDED_FOR = '10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_login_with_a_non_object_body_is_a_client_error(self):
+        url = reverse('account:Account Login')
+        response = self.client.post(url, [1, 2], format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_async_login_is_throttled(self):
+        url = reverse('account:Account Login Async')
+        with mock.patch.object(login_email_limiter, 'limit', 1):
+            self.client.post(url, self.credentials, format = 'json')
+            response = self.client.post(url, self.credentials, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
@@ -1,12 +1,17 @@
+from unittest import mock
+
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from account.models import Account
+from account.hashing import HashingPool
+from account.views import accountPagination
 
 from rest_framework import status
 from rest_framework.utils import json
 from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
 
+@override_settings(ACTIVITY_FLUSH_INTERVAL = 0)
 class AccountTests(APITestCase, TestCase):
     def setUp(self):
         self.valid_input = {
@@ -44,6 +49,51 @@ class AccountTests(APITestCase, TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
     
+    def test_retrieve_accounts_page_by_page(self):
+        for number in range(4):
+            Account.objects.create(
+                email = f'page{number}@test.com',
+                username = f'pageusername{number}',
+                password = 'pagepassword',
+                passwordConfirmation = 'pagepassword',
+                role = 'buyer'
+            )
+        url = reverse('account:Account Test')
+        expected = [account.email for account in Account.objects.order_by('date_joined', 'id')]
+
+        emails = []
+        response = self.client.get(url, {'page_size': 2}, format = 'json')
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            emails += [row['email'] for row in response.data['results']]
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'], format = 'json')
+        self.assertEqual(emails, expected)
+
+    def test_retrieve_accounts_page_with_invalid_cursor(self):
+        url = reverse('account:Account Test')
+        response = self.client.get(url, {'cursor': 'not-a-cursor'}, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_accounts_page_query_walks_the_index(self):
+        accounts = Account.objects.order_by('date_joined', 'id')
+        accounts = accounts.filter(accountPagination.after([self.user.date_joined, self.user.id]))[:100]
+        plan = accounts.explain()
+        self.assertIn('account_joined_id_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_stream_all_accounts(self):
+        url = reverse('account:Account Test')
+        response = self.client.get(url, {'stream': 'true'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), [
+            {'id': self.user.id, 'email': 'accountemail@test.com', 'username': 'accountusername', 'role': 'buyer',
+             'namaLengkap': None, 'namaPanggilan': None, 'nomorInduk': None, 'nomorHP': None, 'angkatan': None,
+             'jurusan': None, 'namaToko': None, 'tipeDagangan': None}
+        ])
+
     def test_register_account_with_valid_input(self):
         url = reverse('account:Account Register')
         data = self.valid_input
@@ -61,6 +111,49 @@ class AccountTests(APITestCase, TestCase):
             'status': 'Account Successfully Created!'
         })
     
+    def test_register_account_within_query_budget(self):
+        self.client.credentials()
+        url = reverse('account:Account Register')
+        # Uniqueness check, account INSERT and token INSERT.
+        with self.assertNumQueries(3):
+            response = self.client.post(url, self.valid_input, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['token'], Token.objects.get(user__email = self.valid_input['email']).key)
+
+    def test_register_account_reports_every_conflicting_field(self):
+        self.client.credentials()
+        url = reverse('account:Account Register')
+        data = dict(self.valid_input, email = self.data['email'], username = self.data['username'])
+        with self.assertNumQueries(1):
+            response = self.client.post(url, data, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {
+            'email': ['account with this email address already exists.'],
+            'username': ['account with this username already exists.']
+        })
+
+    def test_register_account_hides_stage_timings(self):
+        url = reverse('account:Account Register')
+        response = self.client.post(url, self.valid_input, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(DEBUG = True)
+    def test_register_account_reports_stage_timings_in_debug(self):
+        url = reverse('account:Account Register')
+        response = self.client.post(url, self.valid_input, format = 'json')
+        stages = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        self.assertEqual(stages, ['fields', 'syntax', 'password_policy', 'uniqueness', 'hashing'])
+
+    def test_register_malformed_account_without_queries(self):
+        self.client.credentials()
+        url = reverse('account:Account Register')
+        data = dict(self.valid_input, email = self.data['email'], passwordConfirmation = 'anotherpassword')
+        with self.assertNumQueries(0):
+            response = self.client.post(url, data, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data), ['passwordConfirmation'])
+
     def test_register_account_with_invalid_input(self):
         url = reverse('account:Account Register')
         data = self.invalid_input
@@ -110,6 +203,57 @@ class AccountTests(APITestCase, TestCase):
             'password': '*******'
         })
     
+    def test_retrieve_account_details_ignores_email_case(self):
+        url = reverse('account:Account Profile', kwargs = {'role': self.data['role'], 'email': self.data['email'].upper()})
+        response = self.client.get(url, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], self.data['email'])
+
+    def test_register_rejects_case_variants_of_taken_emails_only(self):
+        url = reverse('account:Account Register')
+        data = {
+            'email': self.data['email'].upper(),
+            'username': self.data['username'].upper(),
+            'password': 'validpassword12',
+            'passwordConfirmation': 'validpassword12',
+            'role': 'buyer'
+        }
+        response = self.client.post(url, data, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+        self.assertNotIn('username', response.data)
+
+        data['email'] = 'another.' + self.data['email']
+        response = self.client.post(url, data, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_retrieve_account_details_conditionally(self):
+        url = reverse('account:Account Profile', kwargs = {'role': self.data['role'], 'email': self.data['email']})
+        response = self.client.get(url, format = 'json')
+        etag = response['ETag']
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+
+        # The token is cached by now, so the account lookup is the only query.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE = response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        patched = self.client.patch(url, {'namaLengkap': 'John Doe'}, format = 'json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['namaLengkap'], 'John Doe')
+        # The PATCH body isn't the GET representation, so only a weak match.
+        self.assertEqual(patched['ETag'], 'W/' + response['ETag'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH = patched['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_retrieve_non_exist_account_details(self):
         url = reverse('account:Account Profile', kwargs = {'role': 'buyer', 'email': 'haha@test.com'})
         response = self.client.get(url, format = 'json')
@@ -179,7 +323,7 @@ class AccountTests(APITestCase, TestCase):
         self.assertEqual(len(response.data), 7)
         self.assertEqual(response.data, {
             'email': 'accountemail@test.com', 
-            'username': 'accountusername', 
+            'username': 'updatedusernamebuyer', 
             'role': 'buyer', 
             'namaLengkap': None, 
             'nomorInduk': None, 
@@ -209,7 +353,7 @@ class AccountTests(APITestCase, TestCase):
         self.assertEqual(len(response.data), 8)
         self.assertEqual(response.data, {
             'email': 'dummytest@seller.com', 
-            'username': 'dummyseller', 
+            'username': 'updatedsellerusername', 
             'role': 'seller', 
             'namaLengkap': None, 
             'namaPanggilan': None, 
@@ -218,6 +362,36 @@ class AccountTests(APITestCase, TestCase):
             'tipeDagangan': None
         })
     
+    def test_patch_buyer_account_writes_all_changes_with_one_update(self):
+        url = reverse('account:Account Profile', kwargs = {'role': self.data['role'], 'email': self.data['email']})
+        data = {
+            'namaLengkap': 'John Doe',
+            'angkatan': '1999',
+            'jurusan': 'Ilmu Kodok'
+        }
+        # Token lookup, account lookup, then SAVEPOINT, UPDATE, reading back
+        # the incremented version, and RELEASE.
+        with self.assertNumQueries(6):
+            response = self.client.patch(url, data, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        account = Account.objects.get(email = self.data['email'])
+        self.assertEqual((account.namaLengkap, account.angkatan, account.jurusan), ('John Doe', '1999', 'Ilmu Kodok'))
+
+    def test_patch_buyer_account_with_one_invalid_field_writes_nothing(self):
+        url = reverse('account:Account Profile', kwargs = {'role': self.data['role'], 'email': self.data['email']})
+        self.client.patch(url, {'namaLengkap': 'John Doe'}, format = 'json')
+
+        data = {
+            'username': 'updatedusernamebuyer',
+            'namaLengkap': 'John Doe'
+        }
+        # Token lookup, account lookup and the username uniqueness check only.
+        with self.assertNumQueries(3):
+            response = self.client.patch(url, data, format = 'json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Account.objects.get(email = self.data['email']).username, self.data['username'])
+
     def test_patch_valid_buyer_account_with_invalid_input(self):
         url = reverse('account:Account Profile', kwargs = {'role': self.data['role'], 'email': self.data['email']})
         data = {
@@ -390,4 +564,65 @@ class AccountTests(APITestCase, TestCase):
         responseNew = self.client.patch(url, data, format = 'json')
 
         self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
-        self.assertEqual(responseNew.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(responseNew.status_code, status.HTTP_400_BAD_REQUEST)
+
+@override_settings(ACTIVITY_FLUSH_INTERVAL = 0)
+class AccountAsyncTests(TestCase):
+    def setUp(self):
+        self.data = {
+            'email': 'asyncemail@account.com',
+            'username': 'asyncusername',
+            'password': 'asyncpassword',
+            'passwordConfirmation': 'asyncpassword',
+            'role': 'buyer'
+        }
+        self.registerUrl = reverse('account:Account Register Async')
+        self.loginUrl = reverse('account:Account Login Async')
+
+    def test_register_account_with_valid_input(self):
+        response = self.client.post(self.registerUrl, self.data, content_type = 'application/json')
+
+        account = Account.objects.get(email = self.data['email'])
+        token = Token.objects.get(user = account).key
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json(), {
+            'email': 'asyncemail@account.com',
+            'username': 'asyncusername',
+            'token': token,
+            'status': 'Account Successfully Created!'
+        })
+        self.assertTrue(account.check_password(self.data['password']))
+
+    def test_register_account_with_inconsistent_of_password_and_its_confirmation(self):
+        data = dict(self.data, passwordConfirmation = 'asyncpassword12')
+        response = self.client.post(self.registerUrl, data, content_type = 'application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Account.objects.filter(email = self.data['email']).exists())
+
+    def test_login_with_valid_and_invalid_password(self):
+        account = Account.objects.create_user(
+            email = self.data['email'],
+            username = self.data['username'],
+            password = self.data['password'],
+            role = self.data['role']
+        )
+        credentials = {'username': self.data['email'], 'password': self.data['password']}
+        response = self.client.post(self.loginUrl, credentials, content_type = 'application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'token': Token.objects.get(user = account).key})
+
+        credentials['password'] = 'wrongpassword'
+        response = self.client.post(self.loginUrl, credentials, content_type = 'application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_register_is_rejected_when_hashing_pool_is_full(self):
+        pool = HashingPool(max_workers = 1, queue_limit = 0)
+        pool._slots.acquire()
+
+        with mock.patch('account.views.hashing_pool', pool):
+            response = self.client.post(self.registerUrl, self.data, content_type = 'application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(Account.objects.filter(email = self.data['email']).exists())
@@ -0,0 +1,140 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+
+class SlidingWindowLimiter:
+    """
+    A thread-safe, in-process sliding-window rate limiter allowing `limit`
+    hits per `window` seconds for each key.
+
+    Every key only keeps the hit counts of the current and the previous
+    fixed window; the sliding count is the current one plus the previous one
+    weighted by how much of it still overlaps the sliding window. At most
+    `max_keys` keys are tracked, least recently hit first out, and keys idle
+    for two windows are swept out every `window` seconds.
+    """
+
+    def __init__(self, limit, window=60, max_keys=100000, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.clock = clock
+        self.rejected = 0
+        # key -> (window index, hits in that window, hits in the one before)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = clock() + window
+
+    def hit(self, key):
+        """
+        Count a hit for `key` and return 0, or return how many seconds to
+        wait if it is over the limit. Refused hits are not counted.
+        """
+        now = self.clock()
+        index, offset = divmod(now, self.window)
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(index)
+                self._next_sweep = now + self.window
+
+            current, previous = self._counts(self._entries.get(key), index)
+            weight = 1 - offset / self.window
+            if current + previous * weight + 1 > self.limit:
+                self.rejected += 1
+                return self._wait(current, previous, offset)
+
+            self._entries[key] = (index, current + 1, previous)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last = False)
+            return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.rejected = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'keys': len(self._entries),
+                'max_keys': self.max_keys,
+                'rejected': self.rejected,
+                'limit': self.limit,
+                'window': self.window,
+            }
+
+    def _counts(self, entry, index):
+        if entry is None:
+            return 0, 0
+        entryIndex, current, previous = entry
+        if entryIndex == index:
+            return current, previous
+        if entryIndex == index - 1:
+            return 0, current
+        return 0, 0
+
+    def _wait(self, current, previous, offset):
+        if current + 1 > self.limit:
+            # Not until the next window, once this one's hits start to fade.
+            return self.window - offset + self.window * (current + 1 - self.limit) / max(current, 1)
+        # Until the previous window's share has faded enough for one more hit.
+        overlap = (self.limit - 1 - current) / previous
+        return max((1 - overlap) * self.window - offset, 0) or 1
+
+    def _sweep(self, index):
+        # Entries are in least recently hit order, so the stale ones are first.
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[0] >= index - 1:
+                break
+            del self._entries[key]
+
+
+login_ip_limiter = SlidingWindowLimiter(
+    limit = getattr(settings, 'LOGIN_THROTTLE_PER_IP', 50),
+    window = getattr(settings, 'LOGIN_THROTTLE_WINDOW', 60),
+    max_keys = getattr(settings, 'LOGIN_THROTTLE_MAX_KEYS', 100000)
+)
+login_email_limiter = SlidingWindowLimiter(
+    limit = getattr(settings, 'LOGIN_THROTTLE_PER_EMAIL', 10),
+    window = getattr(settings, 'LOGIN_THROTTLE_WINDOW', 60),
+    max_keys = getattr(settings, 'LOGIN_THROTTLE_MAX_KEYS', 100000)
+)
+
+
+def throttle_login(ident, email):
+    """
+    Count a login attempt from `ident` (the client IP) for `email`. Returns
+    0 when it may go ahead, or the seconds to wait before retrying.
+    """
+    wait = login_ip_limiter.hit(ident)
+    if not wait and email:
+        wait = login_email_limiter.hit(str(email).strip().lower())
+    return math.ceil(wait)
+
+
+class LoginRateThrottle(BaseThrottle):
+    """
+    Throttles login attempts per client IP and per submitted email, so a
+    refused attempt is answered with 429 before its password is hashed.
+    """
+
+    def allow_request(self, request, view):
+        # A JSON body need not be an object; the view rejects those itself.
+        email = request.data.get('username') if isinstance(request.data, Mapping) else None
+        self.retry_after = throttle_login(self.get_ident(request), email)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
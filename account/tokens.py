@@ -0,0 +1,124 @@
+import base64
+import math
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+
+class InvalidSignedToken(Exception):
+    pass
+
+
+class SignedToken:
+    """
+    A stateless access token of the form
+    `uid.role.flags.iat.exp.jti.signature`, where `flags` is a bitmask of the
+    account's `FLAGS` when the token was issued, `iat` is in milliseconds
+    and `exp` in seconds.
+
+    The signature is an HMAC-SHA256, keyed from `SECRET_KEY`, over everything
+    before it, so the token can be verified without touching the database.
+    A change to the account's flags reaches its tokens when they expire.
+    """
+    key_salt = 'account.tokens.SignedToken'
+    FLAGS = ('is_staff', 'is_superuser', 'is_admin')
+
+    def __init__(self, user_id, role, flags, issued_at, expires_at, jti):
+        self.user_id = user_id
+        self.role = role
+        self.flags = flags
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+        self.jti = jti
+
+    @classmethod
+    def issue(cls, account, ttl=None):
+        if ttl is None:
+            ttl = getattr(settings, 'SIGNED_TOKEN_TTL', 900)
+        now = time.time()
+        flags = sum(1 << index for index, name in enumerate(cls.FLAGS) if getattr(account, name))
+        return cls(account.pk, account.role, flags, int(now * 1000), int(now) + ttl, secrets.token_urlsafe(9))
+
+    @classmethod
+    def parse(cls, value):
+        try:
+            userId, role, flags, issuedAt, expiresAt, jti, signature = value.split('.')
+            token = cls(int(userId), role, int(flags), int(issuedAt), int(expiresAt), jti)
+        except ValueError:
+            raise InvalidSignedToken('Malformed token.')
+
+        if not constant_time_compare(signature, token.signature()):
+            raise InvalidSignedToken('Invalid token signature.')
+        if token.expires_at <= time.time():
+            raise InvalidSignedToken('Token has expired.')
+        return token
+
+    @property
+    def payload(self):
+        return f'{self.user_id}.{self.role}.{self.flags}.{self.issued_at}.{self.expires_at}.{self.jti}'
+
+    def signature(self):
+        digest = salted_hmac(self.key_salt, self.payload, algorithm = 'sha256').digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+    def has_flag(self, name):
+        return bool(self.flags & (1 << self.FLAGS.index(name)))
+
+    def __str__(self):
+        return f'{self.payload}.{self.signature()}'
+
+
+class TokenDenylist:
+    """
+    Record of revoked signed tokens, kept in the `shared` cache so that a
+    revocation reaches every worker and outlives a restart of any of them.
+
+    Single tokens are remembered by `jti` until they would have expired
+    anyway; revoking an account rejects every token it was issued up to now,
+    for as long as such a token can live.
+    """
+
+    def __init__(self, cache_alias='shared'):
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def revoke(self, token):
+        remaining = math.ceil(token.expires_at - time.time())
+        if remaining > 0:
+            self.cache.set(self._token_key(token.jti), True, timeout = remaining)
+
+    def revoke_user(self, user_id):
+        # In milliseconds like `issued_at`, so a token issued right after
+        # this, e.g. on a login after reactivation, isn't caught.
+        revokedAt = int(time.time() * 1000)
+        self.cache.set(self._user_key(user_id), revokedAt, timeout = getattr(settings, 'SIGNED_TOKEN_TTL', 900))
+
+    def is_revoked(self, token):
+        tokenKey = self._token_key(token.jti)
+        userKey = self._user_key(token.user_id)
+        found = self.cache.get_many([tokenKey, userKey])
+        revokedAt = found.get(userKey)
+        if revokedAt is not None and token.issued_at <= revokedAt:
+            return True
+        return tokenKey in found
+
+    def clear(self):
+        """
+        Forget every revocation, together with the rest of the shared cache.
+        """
+        self.cache.clear()
+
+    def _token_key(self, jti):
+        return f'signed-token-revoked:{jti}'
+
+    def _user_key(self, user_id):
+        return f'signed-token-revoked-user:{user_id}'
+
+
+token_denylist = TokenDenylist()
@@ -1,12 +1,14 @@
 from account import views
 from django.urls import path
-from rest_framework.authtoken.views import obtain_auth_token
 
 app_name = 'account'
 
 urlpatterns = [
     path('test/', views.accountTest, name = 'Account Test'),
     path('register/', views.accountRegister, name = 'Account Register'),
-    path('login/', obtain_auth_token, name = 'Account Login'),
+    path('login/', views.AccountLogin.as_view(), name = 'Account Login'),
+    path('logout/', views.accountLogout, name = 'Account Logout'),
+    path('async/register/', views.accountRegisterAsync, name = 'Account Register Async'),
+    path('async/login/', views.accountLoginAsync, name = 'Account Login Async'),
     path('<str:role>/<str:email>/', views.accountProfile, name = 'Account Profile'),
 ]
\ No newline at end of file
@@ -1,43 +1,256 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.http import HttpResponseNotAllowed, JsonResponse
 from django.shortcuts import render
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
 
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.exceptions import Throttled
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 
+from Magerbun_Profile.pagination import KeysetPagination
+from Magerbun_Profile.serialization import FastJSONRenderer, ValuesSerializer
+from Magerbun_Profile.streaming import streaming_json_response, wants_stream
 from account.models import Account
+from account.activity import activity_tracker
+from account.hashing import HashingPoolFull, hashing_pool
 from account.serializers import AccountSerializer
+from account.throttling import LoginRateThrottle, throttle_login
+from account.tokens import SignedToken, token_denylist
 
 # Create your views here.
+# Rows for list endpoints, built straight from `.values_list()`.
+accountRows = ValuesSerializer(AccountSerializer)
+accountPagination = KeysetPagination(ordering = ('date_joined', 'id'))
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes([FastJSONRenderer, BrowsableAPIRenderer])
 def accountTest(request):
     accounts = Account.objects.all()
-    serializer = AccountSerializer(accounts, many = True)
-    data = serializer.data
+    if wants_stream(request):
+        return streaming_json_response(accounts, accountRows)
+    if accountPagination.is_requested(request):
+        data = accountPagination.paginate(accounts, request, accountRows)
+    else:
+        data = accountRows.rows(accounts)
     return Response(data, status = status.HTTP_200_OK)
 
+def _with_server_timing(response, serializer, user = None):
+    """
+    Report how long each validation stage of `serializer` took, in the
+    `Server-Timing` format browsers' dev tools display. Only with DEBUG or
+    to staff: the uniqueness timing tells taken values from free ones.
+    """
+    if serializer.stage_timings and (settings.DEBUG or getattr(user, 'is_staff', False)):
+        response['Server-Timing'] = ', '.join(
+            f'{stage};dur={seconds * 1000:.3f}' for stage, seconds in serializer.stage_timings.items()
+        )
+    return response
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def accountRegister(request):
+    # Query budget: one uniqueness check, the account INSERT and the token
+    # INSERT from `create_auth_token`, whose token is read back from the
+    # account's relation cache rather than the database.
     response = {}
     serializer = AccountSerializer(data = request.data)
     if serializer.is_valid():
         account = serializer.save()
-        token = Token.objects.get(user = account).key
+        token = account.auth_token.key
         response['email'] = account.email
         response['username'] = account.username
         response['token'] = token
         response['status'] = 'Account Successfully Created!'
-        return Response(response, status = status.HTTP_201_CREATED)
-    return Response(serializer.errors, status = status.HTTP_400_BAD_REQUEST)
+        return _with_server_timing(Response(response, status = status.HTTP_201_CREATED), serializer, request.user)
+    return _with_server_timing(Response(serializer.errors, status = status.HTTP_400_BAD_REQUEST), serializer, request.user)
+
+class AccountLogin(ObtainAuthToken):
+    """
+    Same as DRF's `obtain_auth_token`, but `"token_type": "signed"` in the
+    payload issues a stateless signed access token instead.
+    """
+    throttle_classes = [LoginRateThrottle]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data = request.data, context = {'request': request})
+        serializer.is_valid(raise_exception = True)
+        account = serializer.validated_data['user']
+        activity_tracker.touch(account.pk)
+
+        if request.data.get('token_type') == 'signed':
+            token = SignedToken.issue(account)
+            response = {
+                'token': str(token),
+                'token_type': 'Bearer',
+                'expires_at': token.expires_at
+            }
+            return Response(response, status = status.HTTP_200_OK)
+
+        token, created = Token.objects.get_or_create(user = account)
+        return Response({'token': token.key}, status = status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def accountLogout(request):
+    if isinstance(request.auth, SignedToken):
+        token_denylist.revoke(request.auth)
+    elif isinstance(request.auth, Token):
+        request.auth.delete()
+    return Response(status = status.HTTP_204_NO_CONTENT)
+
+# Async counterparts of `AccountLogin` and `accountRegister`. Under ASGI they
+# run on the event loop and hand PBKDF2 to `hashing_pool`, answering 503
+# straight away when the pool is saturated instead of stalling the worker.
+def _parse_body(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST.dict()
+
+def _pool_full_response():
+    response = JsonResponse({'error': 'Sorry, the server is busy, please try again later'}, status = status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '1'
+    return response
+
+def _throttled_response(wait):
+    response = JsonResponse({'detail': str(Throttled(wait).detail)}, status = status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(wait)
+    return response
+
+def _get_account(email):
+    return Account.objects.filter(email_lookup = Account.lookup_key(email)).first()
+
+async def accountLoginAsync(request):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    data = _parse_body(request)
+    if data is None:
+        return JsonResponse({'detail': 'JSON parse error'}, status = status.HTTP_400_BAD_REQUEST)
+
+    email = data.get('username')
+    password = data.get('password')
+    if not email or not password:
+        message = {'non_field_errors': ['Must include "username" and "password".']}
+        return JsonResponse(message, status = status.HTTP_400_BAD_REQUEST)
+
+    wait = throttle_login(LoginRateThrottle().get_ident(request), email)
+    if wait:
+        return _throttled_response(wait)
+
+    account = await sync_to_async(_get_account)(email)
+    try:
+        if account is None:
+            # Hash anyway so a missing account takes as long as a wrong password.
+            await hashing_pool.run(make_password, password)
+            valid = False
+        else:
+            valid = await hashing_pool.run(check_password, password, account.password)
+    except HashingPoolFull:
+        return _pool_full_response()
+
+    if not valid or not account.is_active:
+        message = {'non_field_errors': ['Unable to log in with provided credentials.']}
+        return JsonResponse(message, status = status.HTTP_400_BAD_REQUEST)
+    activity_tracker.touch(account.pk)
+
+    if data.get('token_type') == 'signed':
+        token = SignedToken.issue(account)
+        response = {
+            'token': str(token),
+            'token_type': 'Bearer',
+            'expires_at': token.expires_at
+        }
+        return JsonResponse(response, status = status.HTTP_200_OK)
+
+    token, created = await sync_to_async(Token.objects.get_or_create)(user = account)
+    return JsonResponse({'token': token.key}, status = status.HTTP_200_OK)
+
+accountLoginAsync.csrf_exempt = True
+
+async def accountRegisterAsync(request):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    data = _parse_body(request)
+    if data is None:
+        return JsonResponse({'detail': 'JSON parse error'}, status = status.HTTP_400_BAD_REQUEST)
+
+    serializer = AccountSerializer(data = data)
+    if not await sync_to_async(serializer.is_valid)():
+        return _with_server_timing(JsonResponse(serializer.errors, status = status.HTTP_400_BAD_REQUEST), serializer)
+
+    try:
+        with serializer.timed_stage('hashing'):
+            passwordHash = await hashing_pool.run(make_password, serializer.validated_data['password'])
+        account = await sync_to_async(serializer.save)(password_hash = passwordHash)
+    except HashingPoolFull:
+        return _pool_full_response()
+
+    response = {}
+    response['email'] = account.email
+    response['username'] = account.username
+    response['token'] = account.auth_token.key
+    response['status'] = 'Account Successfully Created!'
+    return _with_server_timing(JsonResponse(response, status = status.HTTP_201_CREATED), serializer)
+
+accountRegisterAsync.csrf_exempt = True
+
+# Profile fields shown to, and editable by, each role. The serializer classes
+# and the columns loaded for `accountProfile` are derived from these.
+PROFILE_FIELDS = {
+    'buyer': ('username', 'email', 'role', 'namaLengkap', 'nomorInduk', 'angkatan', 'jurusan'),
+    'seller': ('username', 'email', 'role', 'namaLengkap', 'namaPanggilan', 'nomorHP', 'namaToko', 'tipeDagangan'),
+}
+PROFILE_UPDATE_FIELDS = {
+    'buyer': PROFILE_FIELDS['buyer'] + ('password', 'passwordConfirmation'),
+    'seller': PROFILE_FIELDS['seller'],
+}
+
+def _profile_etag(account):
+    return quote_etag(f'{account.pk}-{account.version}')
+
+def _profile_not_modified(request, account):
+    """
+    Evaluate If-None-Match, or failing that If-Modified-Since, against the
+    version columns alone so a 304 never serializes the profile.
+    """
+    ifNoneMatch = request.META.get('HTTP_IF_NONE_MATCH')
+    if ifNoneMatch:
+        # If-None-Match uses the weak comparison, so W/ prefixes don't matter.
+        etags = [etag[2:] if etag.startswith('W/') else etag for etag in parse_etags(ifNoneMatch)]
+        return '*' in etags or _profile_etag(account) in etags
+
+    ifModifiedSince = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE') or '')
+    return ifModifiedSince is not None and int(account.updated_at.timestamp()) <= ifModifiedSince
+
+def _with_validators(response, account, weak = False):
+    # Weak for bodies other than the GET representation, which are only
+    # equivalent to it.
+    response['ETag'] = ('W/' if weak else '') + _profile_etag(account)
+    response['Last-Modified'] = http_date(account.updated_at.timestamp())
+    return response
 
 @api_view(['GET', 'PATCH'])
 @permission_classes([IsAdminUser|IsAuthenticated])
 def accountProfile(request, role, email):
+    columns = (PROFILE_FIELDS if request.method == 'GET' else PROFILE_UPDATE_FIELDS).get(role)
+    accounts = Account.objects.only(*columns, 'is_active', 'version', 'updated_at') if columns else Account.objects.all()
     try:
-        account = Account.objects.get(email = email)
+        account = accounts.get(email_lookup = Account.lookup_key(email))
     except Account.DoesNotExist:
         message = {'error': 'Sorry, seems there\'s a problem with your email'}
         return Response(message, status = status.HTTP_404_NOT_FOUND)
@@ -51,36 +264,31 @@ def accountProfile(request, role, email):
         return Response(message, status = status.HTTP_400_BAD_REQUEST)
     
     if request.method == 'GET':
+        if _profile_not_modified(request, account):
+            return _with_validators(Response(status = status.HTTP_304_NOT_MODIFIED), account)
+
         serializer = None
         data = None
 
         if account.role == 'buyer':
-            serializer = AccountSerializer(account, many = False, fields = (
-                'username', 'email', 'role', 'namaLengkap', 'nomorInduk', 'angkatan', 'jurusan'
-            ))
+            serializer = AccountSerializer.for_fields(PROFILE_FIELDS['buyer'])(account, many = False)
             data = serializer.data
             data['password'] = '*******'
         elif account.role == 'seller':
-            serializer = AccountSerializer(account, many = False, fields = (
-                'username', 'email', 'role', 'namaLengkap', 'namaPanggilan', 'nomorHP', 'namaToko', 'tipeDagangan'
-            ))
+            serializer = AccountSerializer.for_fields(PROFILE_FIELDS['seller'])(account, many = False)
             data = serializer.data
             data['password'] = '*******'
 
-        return Response(data, status = status.HTTP_200_OK)
+        return _with_validators(Response(data, status = status.HTTP_200_OK), account)
     elif request.method == 'PATCH':
         
         serializer = None
         if account.role == 'buyer':
-            serializer = AccountSerializer(account, data = request.data, partial = True, fields = (
-                'username', 'email', 'role', 'namaLengkap', 'nomorInduk', 'angkatan', 'jurusan', 'password', 'passwordConfirmation'
-            ))
+            serializer = AccountSerializer.for_fields(PROFILE_UPDATE_FIELDS['buyer'])(account, data = request.data, partial = True)
         elif account.role == 'seller':
-            serializer = AccountSerializer(account, data = request.data, partial = True, fields = (
-                'username', 'email', 'role', 'namaLengkap', 'namaPanggilan', 'nomorHP', 'namaToko', 'tipeDagangan'
-            ))
+            serializer = AccountSerializer.for_fields(PROFILE_UPDATE_FIELDS['seller'])(account, data = request.data, partial = True)
 
         if serializer.is_valid():
-            serializer.update(account.email)
-            return Response(serializer.data, status = status.HTTP_202_ACCEPTED)
-        return Response(serializer.errors, status = status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            serializer.update(account)
+            return _with_server_timing(_with_validators(Response(serializer.data, status = status.HTTP_202_ACCEPTED), account, weak = True), serializer, request.user)
+        return _with_server_timing(Response(serializer.errors, status = status.HTTP_400_BAD_REQUEST), serializer, request.user)
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MenuApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'menu_api'
+
+    def ready(self):
+        # Connects the receivers that publish menu changes to the SSE feed.
+        from menu_api import events  # noqa: F401
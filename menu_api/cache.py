@@ -0,0 +1,179 @@
+"""
+In-process cache of the rendered menu catalogue.
+
+The catalogue version is the `CatalogueVersion` row, which every write to
+`Menu` bumps inside its transaction, so all workers see the same version.
+Each process keeps the rendered payload of the latest version it has seen,
+together with its gzip and brotli encodings, and serves them until the version moves on or `ttl` seconds
+pass, whichever comes first.
+"""
+import gzip
+import threading
+import time
+
+import brotli
+from django.conf import settings
+
+from menu_api.models import CatalogueVersion
+
+
+def catalogue_version():
+    return CatalogueVersion.current()
+
+
+def bump_catalogue_version():
+    """
+    Bump the version inside the current transaction, so it commits, and
+    becomes visible, together with the rows it versions.
+    """
+    return CatalogueVersion.bump()
+
+
+def compress(payload):
+    """
+    The payload in every content coding we can serve, built once per
+    catalogue version. Tiny payloads aren't worth compressing.
+    """
+    variants = {'identity': payload}
+    if len(payload) >= 200:
+        variants['gzip'] = gzip.compress(payload, mtime=0)
+        variants['br'] = brotli.compress(payload)
+    return variants
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    The best coding `compress` produces that the Accept-Encoding header
+    allows, preferring brotli over gzip over identity.
+    """
+    accepted = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in ('br', 'gzip'):
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return 'identity'
+
+
+class CatalogueCache:
+    """
+    Holds the payload of one catalogue version, in every content coding.
+    Concurrent misses for the same version are coalesced: one thread
+    builds, the rest wait for it. Payloads whose variants add up to more
+    than `max_bytes` are served but not kept, and kept ones are rebuilt
+    after `ttl` seconds (never with None) in case a write was missed.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, wait_timeout=30, ttl=None, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.wait_timeout = wait_timeout
+        self.ttl = ttl
+        self.clock = clock
+        self._entry = None
+        self._building = {}
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def get(self, version, build):
+        return self.variants(version, build)['identity']
+
+    def get_encoded(self, version, build, encoding):
+        """
+        Return `(coding, payload)`: the `encoding` variant of `version` when
+        there is one, the identity payload otherwise.
+        """
+        variants = self.variants(version, build)
+        if encoding in variants:
+            return encoding, variants[encoding]
+        return 'identity', variants['identity']
+
+    def variants(self, version, build):
+        """
+        The payload of `version` in every coding, calling `build` for the
+        identity payload on a miss.
+        """
+        with self._lock:
+            if self._is_fresh(version):
+                self.hits += 1
+                return self._entry[1]
+            self.misses += 1
+            event = self._building.get(version)
+            leader = event is None
+            if leader:
+                event = self._building[version] = threading.Event()
+
+        if not leader:
+            event.wait(self.wait_timeout)
+            with self._lock:
+                if self._is_fresh(version):
+                    self.coalesced += 1
+                    return self._entry[1]
+            # The builder failed, timed out or the payload was too big.
+            return {'identity': build()}
+
+        try:
+            started = time.perf_counter()
+            variants = compress(build())
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.rebuilds += 1
+                self.rebuild_seconds += elapsed
+                self.last_rebuild_seconds = elapsed
+                size = sum(len(payload) for payload in variants.values())
+                if size <= self.max_bytes and (self._entry is None or self._entry[0] <= version):
+                    self._entry = (version, variants, self.clock())
+            return variants
+        finally:
+            with self._lock:
+                del self._building[version]
+            event.set()
+
+    def _is_fresh(self, version):
+        if self._entry is None or self._entry[0] != version:
+            return False
+        return self.ttl is None or self.clock() - self._entry[2] < self.ttl
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+            self._reset_stats()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'rebuilds': self.rebuilds,
+                'last_rebuild_ms': self.last_rebuild_seconds * 1000,
+                'average_rebuild_ms': self.rebuild_seconds / self.rebuilds * 1000 if self.rebuilds else 0.0,
+                'version': self._entry[0] if self._entry else None,
+                'size': sum(len(payload) for payload in self._entry[1].values()) if self._entry else 0,
+                'encodings': sorted(self._entry[1]) if self._entry else [],
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+            }
+
+    def _reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.rebuilds = 0
+        self.rebuild_seconds = 0.0
+        self.last_rebuild_seconds = 0.0
+
+
+catalogue_cache = CatalogueCache(
+    max_bytes=getattr(settings, 'MENU_CACHE_MAX_BYTES', 16 * 1024 * 1024),
+    ttl=getattr(settings, 'MENU_CACHE_TTL', 300),
+)
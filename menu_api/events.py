@@ -0,0 +1,225 @@
+"""
+Server-Sent Events feed of menu changes, served straight by the ASGI
+application at `EVENTS_PATH`. Under WSGI the path answers 404 with a note
+that the feed needs the ASGI server.
+
+Committed writes to `Menu` are published to `broadcaster`, which encodes
+each event once and appends it to every subscriber's bounded queue. A
+subscriber that can't keep up loses its oldest events rather than holding
+up the others or growing without bound; it is told how many it missed so
+it can resync with `changes/`.
+
+The broadcaster is per process: a client only sees the writes made by the
+process it is connected to, so run the feed next to the writers or relay
+events between processes.
+"""
+import asyncio
+import io
+import itertools
+import json
+import threading
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+
+from menu_api.models import Menu
+from menu_api.serializers import MenuSerializer
+
+EVENTS_PATH = '/api/menu/events/'
+
+
+def encode_event(event_id, kind, data):
+    payload = json.dumps(data, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {kind}\ndata: {payload}\n\n'.encode()
+
+
+class Subscription:
+    def __init__(self, loop, queue_size):
+        self.loop = loop
+        self.queue = deque(maxlen=queue_size)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+
+class Broadcaster:
+    """
+    Fans events out to subscribers on any event loop. `publish` may be
+    called from any thread; each loop is woken once per event, however
+    many of its subscribers there are.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.published = 0
+        self.subscriber_count = 0
+        self._ids = itertools.count(1)
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(loop, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(loop, set()).add(subscription)
+            self.subscriber_count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.loop)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self.subscriber_count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.loop]
+
+    def drain(self, subscription):
+        """
+        Take the queued events of `subscription`, preceded by a `dropped`
+        event if some were lost since the last drain.
+        """
+        with self._lock:
+            messages = list(subscription.queue)
+            subscription.queue.clear()
+            dropped, subscription.dropped = subscription.dropped, 0
+        if dropped:
+            messages.insert(0, encode_event(0, 'dropped', {'count': dropped}))
+        return messages
+
+    def publish(self, kind, data):
+        if not self.subscriber_count:
+            return
+        message = encode_event(next(self._ids), kind, data)
+        with self._lock:
+            self.published += 1
+            loops = list(self._subscribers)
+            for subscribers in self._subscribers.values():
+                for subscription in subscribers:
+                    if len(subscription.queue) == subscription.queue.maxlen:
+                        subscription.dropped += 1
+                    subscription.queue.append(message)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                # The loop has closed; its subscribers are gone.
+                pass
+
+    def publish_on_commit(self, kind, data):
+        if self.subscriber_count:
+            transaction.on_commit(lambda: self.publish(kind, data))
+
+    def _wake(self, loop):
+        with self._lock:
+            subscribers = list(self._subscribers.get(loop, ()))
+        for subscription in subscribers:
+            subscription.ready.set()
+
+
+broadcaster = Broadcaster(queue_size=getattr(settings, 'MENU_EVENTS_QUEUE_SIZE', 100))
+
+
+def publish_menu(kind, menu):
+    """
+    Publish `menu` as a `created` or `updated` event once the current
+    transaction commits. Nothing is serialized while nobody listens.
+    """
+    if broadcaster.subscriber_count:
+        broadcaster.publish_on_commit(kind, MenuSerializer(menu).data)
+
+
+# Connected by `MenuApiConfig.ready`; bulk and conditional writes, which
+# send no signals, publish their events themselves.
+@receiver(post_save, sender=Menu)
+def publish_saved_menu(sender, instance, created, **kwargs):
+    publish_menu('created' if created else 'updated', instance)
+
+
+@receiver(post_delete, sender=Menu)
+def publish_deleted_menu(sender, instance, **kwargs):
+    broadcaster.publish_on_commit('deleted', {'id': instance.pk})
+
+
+async def serve_events(receive, send, broadcaster=broadcaster, heartbeat=None):
+    """
+    Stream events from `broadcaster` over an already authenticated ASGI
+    HTTP connection until the client disconnects.
+    """
+    heartbeat = heartbeat or getattr(settings, 'MENU_EVENTS_HEARTBEAT', 15)
+    subscription = broadcaster.subscribe()
+    disconnected = asyncio.Event()
+
+    async def watch():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+        subscription.ready.set()
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+        loop = asyncio.get_running_loop()
+        while not disconnected.is_set():
+            # A timer rather than `wait_for`, which would start a task per
+            # wait for every idle client.
+            timer = loop.call_later(heartbeat, subscription.ready.set)
+            await subscription.ready.wait()
+            timer.cancel()
+            subscription.ready.clear()
+            if disconnected.is_set():
+                break
+            chunks = broadcaster.drain(subscription) or [b': keepalive\n\n']
+            await send({'type': 'http.response.body', 'body': b''.join(chunks), 'more_body': True})
+    finally:
+        broadcaster.unsubscribe(subscription)
+        watcher.cancel()
+
+
+def authenticate(scope):
+    """
+    Run the project's DRF authentication classes against the connection's
+    headers. Returns the account, or None.
+    """
+    request = ASGIRequest(scope, io.BytesIO())
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(request)
+        except exceptions.AuthenticationFailed:
+            return None
+        if result is not None:
+            return result[0]
+    return None
+
+
+async def _reject(send, status, detail):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps({'detail': detail}).encode()})
+
+
+async def events_application(scope, receive, send):
+    if scope['method'] != 'GET':
+        return await _reject(send, 405, 'Method not allowed.')
+    user = await sync_to_async(authenticate)(scope)
+    if user is None:
+        return await _reject(send, 401, 'Authentication credentials were not provided.')
+    await serve_events(receive, send)
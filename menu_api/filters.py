@@ -0,0 +1,108 @@
+"""
+Query-string filters for the menu catalogue.
+
+`?category=`, `?min_price=`/`?max_price=` and `?in_stock=` map onto the
+indexes declared on `Menu`; `?search=` matches words in the name and the
+description through the `menu_api_menu_fts` FTS5 index when the database
+has it, and through LIKE queries otherwise.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+
+from menu_api.models import Menu
+
+FTS_TABLE = 'menu_api_menu_fts'
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('0', 'false', 'no')
+
+_fts_available = {}
+
+
+def has_fts(alias):
+    """
+    Whether the FTS5 table exists on `alias`, checked once per process.
+    """
+    if alias not in _fts_available:
+        connection = connections[alias]
+        _fts_available[alias] = (
+            connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[alias]
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text)
+
+
+def match_expression(terms):
+    """
+    An FTS5 query matching rows that contain every term as a word prefix.
+    Each term is quoted, so user input can't use FTS5 query syntax.
+    """
+    return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+
+def search(queryset, text, use_fts=None):
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+
+    if use_fts is None:
+        use_fts = has_fts(queryset.db)
+    if use_fts:
+        rowids = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match_expression(terms),))
+        return queryset.filter(id__in=rowids)
+
+    for term in terms:
+        queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+    return queryset
+
+
+def _price(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: ['A valid number is required.']})
+    if not price.is_finite():
+        raise ValidationError({name: ['A valid number is required.']})
+    return price
+
+
+def filter_menu(queryset, params):
+    """
+    Apply the filters present in `params` (the request's query params).
+    Invalid values are rejected with a 400 rather than ignored.
+    """
+    category = params.get('category')
+    if category:
+        if category not in dict(Menu.list_category):
+            raise ValidationError({'category': [f'"{category}" is not a valid choice.']})
+        queryset = queryset.filter(category=category)
+
+    min_price = _price(params, 'min_price')
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    max_price = _price(params, 'max_price')
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+
+    in_stock = params.get('in_stock', '').lower()
+    if in_stock in TRUE_VALUES:
+        queryset = queryset.filter(stock__gt=0)
+    elif in_stock in FALSE_VALUES:
+        queryset = queryset.filter(stock=0)
+    elif in_stock:
+        raise ValidationError({'in_stock': ['Must be true or false.']})
+
+    text = params.get('search', '')
+    if text:
+        queryset = search(queryset, text)
+    return queryset
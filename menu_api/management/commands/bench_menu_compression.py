@@ -0,0 +1,73 @@
+import gzip
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from account.models import Account
+from menu_api import cache
+from menu_api.cache import catalogue_cache
+from menu_api.models import Menu
+from menu_api.views import MenuList
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure bytes on the wire and CPU time per request of the menu list: '
+        'identity, the cached gzip/brotli variants, gzip compressed per '
+        'request, and a 304 revalidation. Rows are inserted in a transaction '
+        'that is rolled back, so the database is left as it was.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            Menu.objects.bulk_create([
+                Menu(
+                    name=f'Menu {number}',
+                    price=Decimal(1000 + number % 50 * 500),
+                    stock=number % 20,
+                    description=f'Nasi goreng spesial nomor {number}',
+                    category=(Menu.makanan, Menu.minuman)[number % 2],
+                ) for number in range(options['size'])
+            ], batch_size=1000)
+            self.account = Account.objects.create_user(
+                email='bench.compression@yandex.com', username='benchcompression', password='benchcompression', role='buyer'
+            )
+            catalogue_cache.clear()
+            self.run_cases(options['size'], options['requests'])
+            transaction.set_rollback(True)
+
+    def run_cases(self, size, requests):
+        etag = self.request({})['ETag']
+        cases = [
+            ('identity', {}, None),
+            ('gzip, cached', {'HTTP_ACCEPT_ENCODING': 'gzip'}, None),
+            ('gzip, per request', {}, lambda body: gzip.compress(body)),
+            ('304', {'HTTP_IF_NONE_MATCH': etag}, None),
+        ]
+        if cache.brotli is not None:
+            cases.insert(2, ('br, cached', {'HTTP_ACCEPT_ENCODING': 'br'}, None))
+
+        self.stdout.write(f'{size} menu items, {requests} requests each')
+        for name, headers, encode in cases:
+            started = time.process_time()
+            for _ in range(requests):
+                body = self.request(headers).content
+                if encode is not None:
+                    body = encode(body)
+            elapsed = time.process_time() - started
+            self.stdout.write(f'  {name:<20}{len(body):>10} bytes{elapsed / requests * 1000:>10.3f} ms CPU')
+
+    def request(self, headers):
+        request = APIRequestFactory().get('/api/menu/', **headers)
+        force_authenticate(request, user=self.account)
+        response = MenuList.as_view()(request)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from menu_api.events import Broadcaster, serve_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the SSE feed: connect thousands of idle subscribers to '
+        'a broadcaster through `serve_events` and measure memory per '
+        'subscriber and how long an event takes to reach all of them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=5000)
+        parser.add_argument('--events', type=int, default=50)
+        parser.add_argument('--queue-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options['subscribers'], options['events'], options['queue_size']))
+
+    async def run(self, count, events, queue_size):
+        broadcaster = Broadcaster(queue_size=queue_size)
+        closed = asyncio.Event()
+        received = [0]
+        sent_bytes = [0]
+        all_received = asyncio.Event()
+        target = [0]
+
+        async def receive():
+            await closed.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message['body'].startswith(b'id:'):
+                sent_bytes[0] += len(message['body'])
+                received[0] += message['body'].count(b'\n\n')
+                if received[0] >= target[0]:
+                    all_received.set()
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        started = time.perf_counter()
+        feeds = [asyncio.ensure_future(serve_events(receive, send, broadcaster, heartbeat=3600)) for _ in range(count)]
+        while broadcaster.subscriber_count < count:
+            await asyncio.sleep(0.01)
+        connect_time = time.perf_counter() - started
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        memory = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+        latencies = []
+        publish_times = []
+        for number in range(events):
+            target[0] = count * (number + 1)
+            all_received.clear()
+            started = time.perf_counter()
+            # Published from a worker thread, like a sync view committing.
+            thread = threading.Thread(target=self.publish, args=(broadcaster, number, publish_times))
+            thread.start()
+            await all_received.wait()
+            latencies.append(time.perf_counter() - started)
+            thread.join()
+
+        # A subscriber that stops reading only keeps `queue_size` events.
+        slow = broadcaster.subscribe()
+        for number in range(queue_size * 3):
+            broadcaster.publish('stock', {'id': 1, 'stock': number})
+        slow_backlog = len(slow.queue)
+        slow_dropped = slow.dropped
+        broadcaster.unsubscribe(slow)
+
+        closed.set()
+        await asyncio.gather(*feeds)
+
+        latencies.sort()
+        self.stdout.write(f'{count} idle subscribers connected in {connect_time:.2f}s, {memory / count:.0f} bytes each')
+        self.stdout.write(
+            f'fan-out of one event to all: median {latencies[len(latencies) // 2] * 1000:.1f} ms, '
+            f'max {latencies[-1] * 1000:.1f} ms; publish call {sum(publish_times) / len(publish_times) * 1000:.2f} ms'
+        )
+        self.stdout.write(f'{received[0]} events delivered, {sent_bytes[0] / 1024:.0f} KiB written')
+        self.stdout.write(f'stalled subscriber: {slow_backlog} queued, {slow_dropped} dropped (queue size {queue_size})')
+
+    def publish(self, broadcaster, number, publish_times):
+        started = time.perf_counter()
+        broadcaster.publish('stock', {'id': number, 'stock': number})
+        publish_times.append(time.perf_counter() - started)
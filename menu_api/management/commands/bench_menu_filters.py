@@ -0,0 +1,77 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from menu_api import filters
+from menu_api.models import Menu
+from menu_api.serializers import MenuSerializer
+from Magerbun_Profile.serialization import ValuesSerializer
+
+WORDS = (
+    'nasi', 'mie', 'ayam', 'goreng', 'bakar', 'rebus', 'pedas', 'manis', 'teh',
+    'kopi', 'susu', 'jeruk', 'es', 'soto', 'sate', 'bakso', 'tahu', 'tempe',
+    'telur', 'sapi', 'ikan', 'udang', 'sambal', 'kecap', 'keju', 'coklat',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the menu filters and search against fetching the whole table, '
+        'on generated catalogues. Rows are inserted in a transaction that is '
+        'rolled back, so the database is left as it was.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.populate(size)
+                self.run_cases(size, options['repeat'])
+                transaction.set_rollback(True)
+
+    def populate(self, size):
+        generator = random.Random(size)
+        Menu.objects.bulk_create([
+            Menu(
+                name=' '.join(generator.sample(WORDS, 2)).title(),
+                price=Decimal(generator.randrange(1000, 50000, 500)),
+                stock=generator.choice((0, 0, 1, 5, 20)),
+                description=' '.join(generator.sample(WORDS, 6)),
+                category=generator.choice((Menu.makanan, Menu.minuman)),
+            ) for _ in range(size)
+        ], batch_size=1000)
+
+    def run_cases(self, size, repeat):
+        rows = ValuesSerializer(MenuSerializer)
+        menu = Menu.objects.order_by('id')
+        cases = (
+            ('whole table', {}),
+            ('category + price', {'category': 'minuman', 'min_price': '10000', 'max_price': '15000'}),
+            ('in stock, page of 100', {'in_stock': 'true'}),
+            ('search', {'search': 'ayam pedas'}),
+        )
+
+        self.stdout.write(f'{size} menu items')
+        for name, params in cases:
+            queryset = filters.filter_menu(menu, params)
+            if name.startswith('in stock'):
+                queryset = queryset[:100]
+            self.report(name, lambda: rows.rows(queryset.all()), repeat)
+
+        like = filters.search(menu, 'ayam pedas', use_fts=False)
+        self.report('search (LIKE)', lambda: rows.rows(like.all()), repeat)
+
+    def report(self, name, run, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        self.stdout.write(f'  {name:<24}{best * 1000:>10.2f} ms{len(result):>10} rows')
@@ -0,0 +1,96 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from menu_api.models import Menu
+from menu_api.stock import ReservationFailed, reserve_stock
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test `reserve_stock` with concurrent orders over a few hot '
+        'menus and check that nothing is oversold. It runs against a scratch '
+        'SQLite file migrated for the purpose, never the configured database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--orders', type=int, default=200, help='Orders per thread.')
+        parser.add_argument('--menus', type=int, default=5)
+        parser.add_argument('--stock', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # The worker threads need their own connections, so one rolled back
+        # transaction won't do; point the default alias at a scratch file.
+        old_name = connection.settings_dict['NAME']
+        old_test = connection.settings_dict.get('TEST', {})
+        with tempfile.TemporaryDirectory() as directory:
+            connection.settings_dict['TEST'] = {**old_test, 'NAME': os.path.join(directory, 'bench.sqlite3')}
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.bench(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                connection.settings_dict['TEST'] = old_test
+
+    def bench(self, options):
+        ids = [
+            Menu.objects.create(name=f'Reserve bench {number}', price=Decimal('1000'), stock=options['stock']).pk
+            for number in range(options['menus'])
+        ]
+
+        lock = threading.Lock()
+        reserved = dict.fromkeys(ids, 0)
+        counts = {'ok': 0, 'rejected': 0, 'locked': 0}
+
+        def worker(seed):
+            generator = random.Random(seed)
+            try:
+                for _ in range(options['orders']):
+                    items = [(generator.choice(ids), generator.randint(1, 3)) for _ in range(generator.randint(1, 3))]
+                    # Hand the items over unsorted, as a client would.
+                    generator.shuffle(items)
+                    try:
+                        reserve_stock(items)
+                    except ReservationFailed:
+                        outcome = 'rejected'
+                    except OperationalError:
+                        outcome = 'locked'
+                    else:
+                        outcome = 'ok'
+                    with lock:
+                        counts[outcome] += 1
+                        if outcome == 'ok':
+                            for menu_id, quantity in items:
+                                reserved[menu_id] += quantity
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        stocks = dict(Menu.objects.using(connection.alias).filter(pk__in=ids).values_list('id', 'stock'))
+
+        total = sum(counts.values())
+        self.stdout.write(
+            f'{total} orders from {options["threads"]} threads in {elapsed:.2f}s ({total / elapsed:.0f} orders/s): '
+            f'{counts["ok"]} reserved, {counts["rejected"]} out of stock, {counts["locked"]} lock timeouts'
+        )
+        oversold = [
+            menu_id for menu_id in ids
+            if stocks[menu_id] < 0 or stocks[menu_id] != options['stock'] - reserved[menu_id]
+        ]
+        if oversold:
+            raise CommandError(f'Stock does not add up for menus {oversold}')
+        self.stdout.write(self.style.SUCCESS('Stock adds up for every menu, nothing was oversold.'))
@@ -0,0 +1,77 @@
+from django.db import migrations
+
+# An external-content FTS5 index over Menu.name and Menu.description. The
+# triggers keep it in sync with every INSERT, UPDATE and DELETE, including
+# bulk ones that skip model signals. Only created on SQLite builds with FTS5;
+# elsewhere search falls back to LIKE queries.
+TABLE_SQL = (
+    "CREATE VIRTUAL TABLE menu_api_menu_fts USING fts5("
+    "name, description, content='menu_api_menu', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+)
+
+# SQLite drops a table's triggers whenever a migration rebuilds it, so later
+# migrations that alter menu_api_menu call `restore_triggers`.
+TRIGGER_SQL = (
+    "CREATE TRIGGER menu_api_menu_fts_insert AFTER INSERT ON menu_api_menu BEGIN "
+    "INSERT INTO menu_api_menu_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER menu_api_menu_fts_delete AFTER DELETE ON menu_api_menu BEGIN "
+    "INSERT INTO menu_api_menu_fts(menu_api_menu_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER menu_api_menu_fts_update AFTER UPDATE OF name, description ON menu_api_menu BEGIN "
+    "INSERT INTO menu_api_menu_fts(menu_api_menu_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO menu_api_menu_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+)
+REBUILD_SQL = "INSERT INTO menu_api_menu_fts(menu_api_menu_fts) VALUES ('rebuild')"
+
+DROP_TRIGGER_SQL = (
+    "DROP TRIGGER IF EXISTS menu_api_menu_fts_insert",
+    "DROP TRIGGER IF EXISTS menu_api_menu_fts_delete",
+    "DROP TRIGGER IF EXISTS menu_api_menu_fts_update",
+)
+DROP_TABLE_SQL = "DROP TABLE IF EXISTS menu_api_menu_fts"
+
+
+def has_fts5(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def has_fts_table(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    return 'menu_api_menu_fts' in schema_editor.connection.introspection.table_names()
+
+
+def create_fts(apps, schema_editor):
+    if has_fts5(schema_editor):
+        schema_editor.execute(TABLE_SQL)
+        for sql in TRIGGER_SQL:
+            schema_editor.execute(sql)
+        schema_editor.execute(REBUILD_SQL)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_TRIGGER_SQL:
+            schema_editor.execute(sql)
+        schema_editor.execute(DROP_TABLE_SQL)
+
+
+def restore_triggers(apps, schema_editor):
+    if has_fts_table(schema_editor):
+        for sql in DROP_TRIGGER_SQL + TRIGGER_SQL:
+            schema_editor.execute(sql)
+        schema_editor.execute(REBUILD_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_api', '0002_menu_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
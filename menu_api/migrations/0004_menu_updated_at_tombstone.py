@@ -0,0 +1,35 @@
+# Generated by Django 3.2.7 on 2026-10-18 13:41
+
+import importlib
+
+from django.db import migrations, models
+import django.utils.timezone
+
+fts = importlib.import_module('menu_api.migrations.0003_menu_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_api', '0003_menu_fts'),
+    ]
+
+    operations = [
+        # Unapplying drops the column, which rebuilds the table again.
+        migrations.RunPython(migrations.RunPython.noop, fts.restore_triggers),
+        migrations.CreateModel(
+            name='MenuTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('menu_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        # Adding the column rebuilt menu_api_menu without its FTS triggers.
+        migrations.RunPython(fts.restore_triggers, migrations.RunPython.noop),
+    ]
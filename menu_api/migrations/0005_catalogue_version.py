@@ -0,0 +1,26 @@
+# Generated by Django 3.2.7 on 2026-10-18 14:19
+
+from django.db import migrations, models
+
+
+def create_counter(apps, schema_editor):
+    CatalogueVersion = apps.get_model('menu_api', 'CatalogueVersion')
+    CatalogueVersion.objects.using(schema_editor.connection.alias).create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_api', '0004_menu_updated_at_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_counter, migrations.RunPython.noop),
+    ]
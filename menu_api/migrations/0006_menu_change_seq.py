@@ -0,0 +1,40 @@
+# Generated by Django 3.2.7 on 2026-10-18 14:21
+
+import importlib
+
+from django.db import migrations, models
+
+fts = importlib.import_module('menu_api.migrations.0003_menu_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_api', '0005_catalogue_version'),
+    ]
+
+    operations = [
+        # Unapplying rebuilds menu_api_menu again.
+        migrations.RunPython(migrations.RunPython.noop, fts.restore_triggers),
+        migrations.RemoveField(
+            model_name='menu',
+            name='updated_at',
+        ),
+        migrations.AddField(
+            model_name='catalogueversion',
+            name='pruned',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='menutombstone',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        # Changing the columns rebuilt menu_api_menu without its FTS triggers.
+        migrations.RunPython(fts.restore_triggers, migrations.RunPython.noop),
+    ]
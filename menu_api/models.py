@@ -1,4 +1,11 @@
-from django.db import models
+import datetime
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models, router, transaction
+from django.db.models import F, Max
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
 
 
 # Create your models here.
@@ -14,3 +21,83 @@ class Menu(models.Model):
     stock = models.PositiveIntegerField()
     description = models.TextField(max_length=250, default="deskripsi")
     category = models.CharField(choices=list_category, default=makanan, max_length=100)
+    # The catalogue version of the write that last changed the row, taken
+    # inside that write's transaction. `changes/` reads rows past a version.
+    change_seq = models.BigIntegerField(default=0, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'price'], name='menu_category_price_idx'),
+            models.Index(fields=['price'], name='menu_price_idx'),
+            # Lets `?in_stock=true` walk the primary key order of only the
+            # rows that are in stock, e.g. for keyset pages.
+            models.Index(fields=['id'], condition=models.Q(stock__gt=0), name='menu_in_stock_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The version is bumped in the same transaction as the row is written.
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Menu, instance=self), savepoint=False):
+            self.change_seq = CatalogueVersion.bump()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+            super().save(*args, **kwargs)
+
+
+class CatalogueVersion(models.Model):
+    """
+    A single row counting the writes to `Menu`: its value is the catalogue
+    version. Writers bump it inside their own transaction, which holds the
+    row's write lock until commit, so versions are handed out in commit
+    order and become visible, to every process, exactly when their rows do.
+    """
+    value = models.BigIntegerField(default=0)
+    # The newest version whose tombstones have been pruned; `changes/`
+    # can't answer for tokens before it.
+    pruned = models.BigIntegerField(default=0)
+
+    # Read from the primary: a lagging replica would hand out a version
+    # that is older than the rows read with it, or newer than the replica's.
+    @classmethod
+    def current(cls):
+        return cls.objects.using(DEFAULT_DB_ALIAS).filter(pk=1).values_list('value', flat=True).first() or 0
+
+    @classmethod
+    def current_and_pruned(cls):
+        return cls.objects.using(DEFAULT_DB_ALIAS).filter(pk=1).values_list('value', 'pruned').first() or (0, 0)
+
+    @classmethod
+    def bump(cls):
+        """
+        Increment the version and return the new value. Call it inside the
+        transaction that changes the menus.
+        """
+        rows = cls.objects.filter(pk=1)
+        with transaction.atomic(using=router.db_for_write(cls), savepoint=False):
+            if not rows.update(value=F('value') + 1):
+                # The row is made by a migration; a flushed database lacks it.
+                cls.objects.get_or_create(pk=1)
+                rows.update(value=F('value') + 1)
+            return rows.values_list('value', flat=True).get()
+
+
+class MenuTombstone(models.Model):
+    """
+    Remembers deleted menus so `changes/` can tell clients to drop them.
+    """
+    menu_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField(default=0, db_index=True)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+
+@receiver(post_delete, sender=Menu)
+def record_tombstone(sender, instance, **kwargs):
+    # Deletes run in a transaction, which this bump joins.
+    now = timezone.now()
+    MenuTombstone.objects.create(menu_id=instance.pk, change_seq=CatalogueVersion.bump(), deleted_at=now)
+    retention = datetime.timedelta(days=getattr(settings, 'MENU_TOMBSTONE_RETENTION_DAYS', 30))
+    stale = MenuTombstone.objects.filter(deleted_at__lt=now - retention)
+    pruned = stale.aggregate(pruned=Max('change_seq'))['pruned']
+    if pruned is not None:
+        # `changes/` refuses tokens before this, so these are never read.
+        CatalogueVersion.objects.filter(pk=1, pruned__lt=pruned).update(pruned=pruned)
+        stale.delete()
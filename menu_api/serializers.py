@@ -1,4 +1,6 @@
+from django.db import transaction
 from rest_framework import serializers
+from menu_api.cache import bump_catalogue_version
 from menu_api.models import Menu
 
 
@@ -27,3 +29,86 @@ class MenuSerializer(serializers.Serializer):
         instance.category = validated_data.get('category', instance.category)
         instance.save()
         return instance
+
+
+class MenuListSerializer(serializers.ListSerializer):
+    """
+    Validates a whole list of menus in one pass and saves it with one
+    `bulk_create` and one `bulk_update` in a single transaction. Items with
+    an `id` replace that menu, the others are created.
+    """
+
+    def to_internal_value(self, data):
+        # Load every menu the payload refers to with one query, for the
+        # items' `validate_id`.
+        ids = []
+        if isinstance(data, list):
+            for item in data:
+                try:
+                    ids.append(int(item['id']))
+                except (TypeError, KeyError, ValueError):
+                    pass
+        self.existing = Menu.objects.in_bulk(ids)
+        self.seen_ids = set()
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        fields = [name for name, field in self.child.fields.items() if not field.read_only and name != 'id']
+        menus = []
+        created = []
+        updated = []
+        for item in validated_data:
+            if item.get('id') is None:
+                menu = Menu(**{name: value for name, value in item.items() if name != 'id'})
+                created.append(menu)
+            else:
+                menu = self.existing[item['id']]
+                for name in fields:
+                    setattr(menu, name, item[name])
+                updated.append(menu)
+            menus.append(menu)
+
+        with transaction.atomic():
+            # Bulk writes don't go through `Menu.save`, so they take the
+            # version for their rows themselves.
+            change_seq = bump_catalogue_version()
+            for menu in menus:
+                menu.change_seq = change_seq
+            Menu.objects.bulk_create(created)
+            if created and created[0].pk is None:
+                # SQLite doesn't return the new ids, but it holds the write
+                # lock until commit, so the newest rows are the ones just made.
+                new_ids = Menu.objects.order_by('-id').values_list('id', flat=True)[:len(created)]
+                for menu, pk in zip(created, sorted(new_ids)):
+                    menu.pk = pk
+            Menu.objects.bulk_update(updated, [*fields, 'change_seq'])
+        return menus
+
+
+class MenuBulkSerializer(MenuSerializer):
+    id = serializers.IntegerField(required=False, min_value=1)
+
+    class Meta:
+        list_serializer_class = MenuListSerializer
+
+    def validate_id(self, value):
+        if value not in self.parent.existing:
+            raise serializers.ValidationError('Menu not found.')
+        if value in self.parent.seen_ids:
+            raise serializers.ValidationError('Menu is listed more than once.')
+        self.parent.seen_ids.add(value)
+        return value
+
+
+# Largest value the database's integer columns take; anything bigger would
+# overflow in the query instead of failing validation.
+MAX_INTEGER = 2 ** 31 - 1
+
+
+class ReservationItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1, max_value=MAX_INTEGER)
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_INTEGER)
+
+
+class ReservationSerializer(serializers.Serializer):
+    items = ReservationItemSerializer(many=True, allow_empty=False)
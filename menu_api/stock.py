@@ -0,0 +1,67 @@
+"""
+Atomic stock reservation.
+
+Each item is taken with a conditional `UPDATE ... SET stock = stock - n
+WHERE id = ? AND stock >= n`, so the check and the decrement happen in the
+database and concurrent orders can't oversell. All items of one order go
+in a single transaction, in ascending id order, so two orders locking the
+same rows always lock them in the same order and can't deadlock.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from menu_api.cache import bump_catalogue_version
+from menu_api.events import broadcaster
+from menu_api.models import Menu
+
+
+class ReservationFailed(Exception):
+    def __init__(self, menu_id, reason):
+        super().__init__(menu_id, reason)
+        self.menu_id = menu_id
+        self.reason = reason
+
+
+class MenuNotFound(ReservationFailed):
+    def __init__(self, menu_id):
+        super().__init__(menu_id, 'Menu not found.')
+
+
+class InsufficientStock(ReservationFailed):
+    def __init__(self, menu_id):
+        super().__init__(menu_id, 'Not enough stock.')
+
+
+def merge_items(items):
+    """
+    Sum the quantities of repeated ids and sort by id, which is the order
+    rows are locked in.
+    """
+    quantities = {}
+    for menu_id, quantity in items:
+        quantities[menu_id] = quantities.get(menu_id, 0) + quantity
+    return sorted(quantities.items())
+
+
+def reserve_stock(items):
+    """
+    Take `quantity` off the stock of every `(menu_id, quantity)` in `items`,
+    all or nothing. Returns `{menu_id: remaining stock}`, or raises
+    `MenuNotFound`/`InsufficientStock` for the first item that can't be
+    taken, with nothing changed.
+    """
+    items = merge_items(items)
+    with transaction.atomic():
+        # Conditional UPDATEs don't go through `Menu.save`, so take the
+        # catalogue version for the rows here.
+        change_seq = bump_catalogue_version()
+        for menu_id, quantity in items:
+            updated = Menu.objects.filter(pk=menu_id, stock__gte=quantity).update(stock=F('stock') - quantity, change_seq=change_seq)
+            if not updated:
+                if Menu.objects.filter(pk=menu_id).exists():
+                    raise InsufficientStock(menu_id)
+                raise MenuNotFound(menu_id)
+        remaining = dict(Menu.objects.filter(pk__in=[menu_id for menu_id, _ in items]).values_list('id', 'stock'))
+        for menu_id, stock in sorted(remaining.items()):
+            broadcaster.publish_on_commit('stock', {'id': menu_id, 'stock': stock})
+        return remaining
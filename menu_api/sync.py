@@ -0,0 +1,65 @@
+"""
+Delta sync of the menu catalogue.
+
+A sync token is a catalogue version. Every write takes the next version
+inside its transaction and stamps its rows (or, for deletes, tombstones)
+with it, and versions are handed out in commit order. `changes/?since=<token>`
+reads the current version first and returns the menus and deleted ids
+stamped after the token and up to that version, read with range scans on
+the `change_seq` indexes. Everything up to that version has committed, so
+it is the token for the next call and no write is skipped, however long
+it took to commit.
+"""
+import base64
+import binascii
+
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.exceptions import APIException, ValidationError
+
+from menu_api.models import CatalogueVersion, Menu, MenuTombstone
+
+
+class SyncTokenExpired(APIException):
+    status_code = 410
+    default_detail = 'Sync token expired, fetch the full menu list again.'
+    default_code = 'sync_token_expired'
+
+
+def encode_token(version):
+    return base64.urlsafe_b64encode(str(version).encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        value = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        value = ''
+    if value.isascii() and value.isdigit():
+        return int(value)
+    raise ValidationError({'since': ['Invalid sync token.']})
+
+
+def menu_changes(since, rows):
+    """
+    The changes after `since` (all menus when None), with menu rows built
+    by the `ValuesSerializer` `rows`.
+    """
+    version, pruned = CatalogueVersion.current_and_pruned()
+    if since is not None and not pruned <= since <= version:
+        # Tombstones after it may have been pruned already, or the token
+        # comes from another database.
+        raise SyncTokenExpired()
+
+    # Read from the primary, like the version above.
+    changed = Menu.objects.using(DEFAULT_DB_ALIAS).filter(change_seq__lte=version).order_by('change_seq', 'id')
+    deleted = []
+    if since is not None:
+        changed = changed.filter(change_seq__gt=since)
+        tombstones = MenuTombstone.objects.using(DEFAULT_DB_ALIAS).filter(change_seq__gt=since, change_seq__lte=version).order_by('change_seq')
+        deleted = list(dict.fromkeys(tombstones.values_list('menu_id', flat=True)))
+
+    return {
+        'changed': rows.rows(changed),
+        'deleted': deleted,
+        'since': encode_token(version),
+    }
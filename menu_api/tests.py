@@ -1,3 +1,700 @@
-from django.test import TestCase
+import asyncio
+import base64
+import datetime
+import gzip
+import json
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import brotli
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from account.models import Account
+from account.tokens import SignedToken
+from menu_api import filters
+from Magerbun_Profile.asgi import application
+from menu_api.events import EVENTS_PATH, Broadcaster, broadcaster
+from menu_api.cache import CatalogueCache, catalogue_cache, catalogue_version, negotiate_encoding
+from menu_api.models import CatalogueVersion, Menu, MenuTombstone
+from menu_api.stock import InsufficientStock, reserve_stock
+from menu_api.sync import decode_token, encode_token
+from menu_api.serializers import MenuSerializer
+from Magerbun_Profile.serialization import FastJSONRenderer, ValuesSerializer
+
+
+@override_settings(ACTIVITY_FLUSH_INTERVAL=0)
+class MenuTestCase(APITestCase, TestCase):
+    def setUp(self):
+        # Each test's rollback takes the catalogue version back, so drop
+        # payloads cached under it by earlier tests.
+        catalogue_cache.clear()
+        self.user = Account.objects.create_user(
+            email='menu.test@yandex.com',
+            username='menutest',
+            password='passwordmenutest',
+            role='seller'
+        )
+        self.token = Token.objects.get(user=self.user).key
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def create_menu(self, **kwargs):
+        data = {
+            'name': 'Nasi Goreng',
+            'price': Decimal('15000.5'),
+            'stock': 10,
+            'description': 'Nasi goreng spesial',
+            'category': Menu.makanan,
+        }
+        data.update(kwargs)
+        return Menu.objects.create(**data)
+
+
+class MenuListTests(MenuTestCase):
+    def test_list_is_byte_compatible_with_menu_serializer(self):
+        self.create_menu()
+        self.create_menu(name='Es Teh é', price=Decimal('3000'), description='dingin\u2028manis', category=Menu.minuman)
+
+        response = self.client.get(reverse('menu_api:Menu List'), HTTP_ACCEPT='application/json')
+
+        expected = JSONRenderer().render(MenuSerializer(Menu.objects.all(), many=True).data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, expected)
+        self.assertEqual(FastJSONRenderer().render(ValuesSerializer(MenuSerializer).rows(Menu.objects.all())), expected)
+
+    def test_list_page_by_page(self):
+        menus = [self.create_menu(name=f'Menu {number}') for number in range(5)]
+        url = reverse('menu_api:Menu List')
+
+        response = self.client.get(url, {'page_size': 3})
+        self.assertEqual([row['id'] for row in response.data['results']], [menu.id for menu in menus[:3]])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], [menu.id for menu in menus[3:]])
+        self.assertIsNone(response.data['next'])
+
+    def test_stream_is_well_formed_json(self):
+        url = reverse('menu_api:Menu List')
+        response = self.client.get(url, {'stream': '1'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), [])
+
+        for number in range(5):
+            self.create_menu(name=f'Menu {number}', description='baris\u2028baru')
+        expected = JSONRenderer().render(MenuSerializer(Menu.objects.all(), many=True).data)
+
+        with self.settings(STREAMING_CHUNK_SIZE=2):
+            response = self.client.get(url, {'stream': '1'})
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(json.loads(content)), 5)
+        self.assertEqual(content, expected)
+
+    def test_create_menu(self):
+        data = {'name': 'Mie Ayam', 'price': '12000.00', 'stock': 5, 'description': 'Mie', 'category': 'makanan'}
+        response = self.client.post(reverse('menu_api:Menu List'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['name'], 'Mie Ayam')
+
+
+class MenuFilterTests(MenuTestCase):
+    def setUp(self):
+        super().setUp()
+        self.nasi = self.create_menu(name='Nasi Goreng', price=Decimal('15000'), stock=10, description='Pedas dengan telur')
+        self.mie = self.create_menu(name='Mie Ayam', price=Decimal('12000'), stock=0, description='Mie dengan ayam')
+        self.teh = self.create_menu(name='Es Teh', price=Decimal('3000'), stock=4, description='Teh manis dingin', category=Menu.minuman)
+        self.url = reverse('menu_api:Menu List')
+
+    def ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data]
+
+    def test_filter_by_category_and_price(self):
+        self.assertEqual(self.ids(category='makanan'), [self.nasi.id, self.mie.id])
+        self.assertEqual(self.ids(category='makanan', max_price='13000'), [self.mie.id])
+        self.assertEqual(self.ids(min_price='3000', max_price='12000'), [self.mie.id, self.teh.id])
+
+    def test_filter_in_stock(self):
+        self.assertEqual(self.ids(in_stock='true'), [self.nasi.id, self.teh.id])
+        self.assertEqual(self.ids(in_stock='false'), [self.mie.id])
+
+    def test_search_name_and_description(self):
+        self.assertEqual(self.ids(search='goreng'), [self.nasi.id])
+        self.assertEqual(self.ids(search='dengan'), [self.nasi.id, self.mie.id])
+        self.assertEqual(self.ids(search='ay'), [self.mie.id])
+        self.assertEqual(self.ids(search='"mie" OR nasi'), [])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        self.nasi.name = 'Nasi Uduk'
+        self.nasi.save()
+        self.mie.delete()
+        self.assertEqual(self.ids(search='goreng'), [])
+        self.assertEqual(self.ids(search='uduk'), [self.nasi.id])
+        self.assertEqual(self.ids(search='ayam'), [])
+
+    def test_search_without_fts(self):
+        with mock.patch.object(filters, 'has_fts', return_value=False):
+            self.assertEqual(self.ids(search='dengan ayam'), [self.mie.id])
+
+    def test_filters_use_indexes(self):
+        self.assertTrue(filters.has_fts('default'))
+        plan = filters.filter_menu(Menu.objects.all(), {'category': 'makanan', 'min_price': '1000'}).explain()
+        self.assertIn('menu_category_price_idx', plan)
+        plan = filters.filter_menu(Menu.objects.order_by('id'), {'in_stock': 'true'}).explain()
+        self.assertIn('menu_in_stock_idx', plan)
+
+    def test_filters_combine_with_pagination(self):
+        response = self.client.get(self.url, {'in_stock': '1', 'page_size': 1})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.nasi.id])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], [self.teh.id])
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'category': 'snack'}, {'min_price': 'abc'}, {'max_price': 'NaN'}, {'in_stock': 'maybe'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class MenuReserveTests(MenuTestCase):
+    def setUp(self):
+        super().setUp()
+        self.nasi = self.create_menu(stock=5)
+        self.teh = self.create_menu(name='Es Teh', stock=2, category=Menu.minuman)
+        self.url = reverse('menu_api:Menu Reserve')
+
+    def reserve(self, *items):
+        data = {'items': [{'id': menu_id, 'quantity': quantity} for menu_id, quantity in items]}
+        return self.client.post(self.url, data, format='json')
+
+    def stocks(self):
+        return list(Menu.objects.order_by('id').values_list('stock', flat=True))
+
+    def test_reserve_several_items(self):
+        # Token lookup, the savepoint pair, one conditional UPDATE per menu,
+        # the version bump and its read back, and the remaining stock.
+        with self.assertNumQueries(8):
+            response = self.reserve((self.teh.id, 1), (self.nasi.id, 2), (self.nasi.id, 1))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'items': [{'id': self.nasi.id, 'stock': 2}, {'id': self.teh.id, 'stock': 1}]})
+        self.assertEqual(self.stocks(), [2, 1])
+
+    def test_reservation_is_all_or_nothing(self):
+        response = self.reserve((self.nasi.id, 2), (self.teh.id, 3))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['id'], self.teh.id)
+        self.assertEqual(self.stocks(), [5, 2])
+
+        response = self.reserve((self.nasi.id, 1), (self.teh.id + 100, 1))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.stocks(), [5, 2])
+
+    def test_stock_never_goes_negative(self):
+        self.assertEqual(self.reserve((self.teh.id, 2)).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.reserve((self.teh.id, 1)).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.stocks(), [5, 0])
+
+    def test_invalid_reservations_are_rejected(self):
+        invalid = (
+            {},
+            {'items': []},
+            {'items': [{'id': self.nasi.id, 'quantity': 0}]},
+            {'items': [{'id': self.nasi.id, 'quantity': 10 ** 30}]},
+            {'items': [{'id': 10 ** 30, 'quantity': 1}]},
+        )
+        for data in invalid:
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+
+
+class ConcurrentReserveTests(TransactionTestCase):
+    def test_concurrent_orders_never_oversell(self):
+        menu = Menu.objects.create(name='Nasi Goreng', price=Decimal('15000'), stock=10, category=Menu.makanan)
+        start = threading.Barrier(8)
+        outcomes = []
+
+        def order():
+            start.wait()
+            try:
+                # The in-memory test database fails lock conflicts at once
+                # instead of waiting; each attempt rolls back as a whole.
+                for _ in range(1000):
+                    try:
+                        reserve_stock([(menu.pk, 3)])
+                    except InsufficientStock:
+                        outcomes.append('rejected')
+                    except OperationalError:
+                        time.sleep(0.001)
+                        continue
+                    else:
+                        outcomes.append('reserved')
+                    return
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=order) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ['rejected'] * 5 + ['reserved'] * 3)
+        self.assertEqual(Menu.objects.get(pk=menu.pk).stock, 1)
+
+
+class MenuBulkTests(MenuTestCase):
+    def setUp(self):
+        super().setUp()
+        self.nasi = self.create_menu()
+        self.teh = self.create_menu(name='Es Teh', price=Decimal('3000'), category=Menu.minuman)
+        self.url = reverse('menu_api:Menu Bulk')
+
+    def item(self, **kwargs):
+        data = {'name': 'Mie Ayam', 'price': '12000.00', 'stock': 5, 'description': 'Mie', 'category': 'makanan'}
+        data.update(kwargs)
+        return data
+
+    def test_create_and_update_in_one_request(self):
+        data = [
+            self.item(name='Soto Ayam'),
+            self.item(id=self.teh.id, name='Es Teh Manis', price='3500.00', category='minuman'),
+            self.item(name='Es Jeruk', category='minuman'),
+        ]
+        # Token lookup, existing menus, the savepoint pair, the INSERT, the
+        # new ids, the UPDATE, and the version bump and its read back.
+        with self.assertNumQueries(9):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual([row['name'] for row in response.data], ['Soto Ayam', 'Es Teh Manis', 'Es Jeruk'])
+        self.assertEqual(response.data[1]['id'], self.teh.id)
+        for row in response.data:
+            self.assertEqual(MenuSerializer(Menu.objects.get(pk=row['id'])).data, row)
+        self.assertEqual(Menu.objects.count(), 4)
+
+    def test_errors_are_reported_per_item(self):
+        data = [
+            self.item(),
+            self.item(price='abc'),
+            self.item(id=self.nasi.id + 100),
+            self.item(id=self.nasi.id),
+            self.item(id=self.nasi.id),
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(list(response.data[1]), ['price'])
+        self.assertEqual(response.data[2], {'id': ['Menu not found.']})
+        self.assertEqual(response.data[3], {})
+        self.assertEqual(response.data[4], {'id': ['Menu is listed more than once.']})
+        self.assertEqual(Menu.objects.count(), 2)
+        self.nasi.refresh_from_db()
+        self.assertEqual(self.nasi.name, 'Nasi Goreng')
+
+    def test_payload_must_be_a_list(self):
+        response = self.client.post(self.url, self.item(), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CatalogueCacheTests(TestCase):
+    def test_concurrent_misses_build_once(self):
+        cache = CatalogueCache()
+        started = threading.Event()
+        release = threading.Event()
+        builds = []
+
+        def build():
+            builds.append(1)
+            started.set()
+            release.wait(5)
+            return b'[]'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(1, build))) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(results, [b'[]'] * 5)
+        self.assertEqual(cache.stats()['rebuilds'], 1)
+
+    def test_new_version_replaces_payload(self):
+        cache = CatalogueCache()
+        self.assertEqual(cache.get(1, lambda: b'[1]'), b'[1]')
+        self.assertEqual(cache.get(1, lambda: b'[2]'), b'[1]')
+        self.assertEqual(cache.get(2, lambda: b'[2]'), b'[2]')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['version'], stats['size']), (1, 2, 2, 3))
+
+    def test_payloads_expire_after_the_ttl(self):
+        now = [0.0]
+        cache = CatalogueCache(ttl=10, clock=lambda: now[0])
+        cache.get(1, lambda: b'[1]')
+        now[0] = 9.0
+        self.assertEqual(cache.get(1, lambda: b'[2]'), b'[1]')
+        now[0] = 10.0
+        self.assertEqual(cache.get(1, lambda: b'[2]'), b'[2]')
+
+    def test_payloads_over_the_bound_are_not_kept(self):
+        cache = CatalogueCache(max_bytes=2)
+        cache.get(1, lambda: b'[1]')
+        self.assertEqual(cache.get(1, lambda: b'[2]'), b'[2]')
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_encodings_are_built_once_per_version(self):
+        cache = CatalogueCache()
+        payload = json.dumps([{'name': 'Nasi Goreng'}] * 20).encode()
+        builds = []
+
+        def build():
+            builds.append(1)
+            return payload
+
+        coding, body = cache.get_encoded(1, build, 'gzip')
+        self.assertEqual((coding, gzip.decompress(body)), ('gzip', payload))
+        self.assertEqual(cache.get_encoded(1, build, 'identity'), ('identity', payload))
+        self.assertEqual(len(builds), 1)
+        # Small payloads aren't compressed.
+        self.assertEqual(cache.get_encoded(2, lambda: b'[]', 'gzip'), ('identity', b'[]'))
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(negotiate_encoding(''), 'identity')
+        self.assertEqual(negotiate_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(negotiate_encoding('*'), 'br')
+        # Falls back to gzip when brotli isn't offered or is refused.
+        self.assertEqual(negotiate_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate_encoding('BR;q=0, gzip;q=0.5'), 'gzip')
+        self.assertEqual(negotiate_encoding('*, br;q=0'), 'gzip')
+        # q=0 refuses a coding, here every one but identity.
+        self.assertEqual(negotiate_encoding('deflate, gzip;q=0'), 'identity')
+        self.assertEqual(negotiate_encoding('br;q=0, gzip;q=0.0'), 'identity')
+        self.assertEqual(negotiate_encoding('*;q=0'), 'identity')
+
+
+class MenuCacheTests(MenuTestCase):
+    def setUp(self):
+        super().setUp()
+        self.nasi = self.create_menu()
+        self.url = reverse('menu_api:Menu List')
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        first = self.client.get(self.url)
+        # Only the version is read; the token comes from the token cache.
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], 'application/json')
+        self.assertEqual(catalogue_cache.stats()['hits'], 1)
+
+    def test_writes_bump_the_version(self):
+        self.client.get(self.url)
+        version = catalogue_version()
+
+        response = self.client.put(reverse('menu_api:Menu Detail', kwargs={'pk': self.nasi.pk}), {
+            'name': 'Nasi Uduk', 'price': '15000.00', 'stock': 3, 'description': 'Uduk', 'category': 'makanan'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(catalogue_version(), version)
+        self.assertEqual(json.loads(self.client.get(self.url).content)[0]['name'], 'Nasi Uduk')
+
+        version = catalogue_version()
+        self.client.post(reverse('menu_api:Menu Reserve'), {'items': [{'id': self.nasi.pk, 'quantity': 1}]}, format='json')
+        self.assertGreater(catalogue_version(), version)
+        self.assertEqual(json.loads(self.client.get(self.url).content)[0]['stock'], 2)
+
+        version = catalogue_version()
+        self.client.post(reverse('menu_api:Menu Bulk'), [{
+            'name': 'Es Teh', 'price': '3000.00', 'stock': 3, 'description': 'Teh', 'category': 'minuman'
+        }], format='json')
+        self.assertGreater(catalogue_version(), version)
+        self.assertEqual(len(json.loads(self.client.get(self.url).content)), 2)
+
+    def test_writes_by_other_workers_are_seen(self):
+        self.client.get(self.url)
+        # Another process changes the row and bumps the shared version.
+        Menu.objects.filter(pk=self.nasi.pk).update(name='Nasi Uduk')
+        CatalogueVersion.objects.update(value=F('value') + 1)
+        self.assertEqual(json.loads(self.client.get(self.url).content)[0]['name'], 'Nasi Uduk')
+
+    def routed_reads(self, url, **extra):
+        routed = []
+
+        def db_for_read(model, **hints):
+            routed.append(model)
+            return 'default'
+
+        with mock.patch('Magerbun_Profile.routers.ReplicaRouter.db_for_read', side_effect=db_for_read):
+            self.assertIn(self.client.get(url, **extra).status_code, (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED))
+        return routed
+
+    def test_only_version_bound_reads_skip_the_router(self):
+        # The catalogue and changes/ pair rows with the primary's version.
+        for url in (self.url, reverse('menu_api:Menu Changes')):
+            routed = self.routed_reads(url)
+            self.assertNotIn(Menu, routed)
+            self.assertNotIn(CatalogueVersion, routed)
+        # Everything else may be served by a replica.
+        detail_url = reverse('menu_api:Menu Detail', kwargs={'pk': self.nasi.pk})
+        self.assertIn(Menu, self.routed_reads(self.url + '?category=makanan'))
+        self.assertIn(Menu, self.routed_reads(detail_url))
+        self.assertIn(Menu, self.routed_reads(detail_url, HTTP_IF_NONE_MATCH='*'))
+
+    def test_stats_are_for_admins_only(self):
+        url = reverse('menu_api:Menu Cache Stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_rate', response.data)
+
+
+class MenuConditionalTests(MenuTestCase):
+    def setUp(self):
+        super().setUp()
+        self.nasi = self.create_menu()
+        self.create_menu(name='Es Teh', price=Decimal('3000'), category=Menu.minuman, description='Teh manis ' * 20)
+        self.url = reverse('menu_api:Menu List')
+        self.detail_url = reverse('menu_api:Menu Detail', kwargs={'pk': self.nasi.pk})
+
+    def test_list_and_detail_answer_304_from_the_version(self):
+        # The detail view also checks that its menu still exists.
+        for url, queries in ((self.url, 1), (self.detail_url, 2), (self.url + '?category=makanan', 1)):
+            etag = self.client.get(url)['ETag']
+            self.assertTrue(etag.startswith('W/"'))
+            with self.assertNumQueries(queries):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response.content, b'')
+
+    def test_missing_menus_are_never_not_modified(self):
+        missing_url = reverse('menu_api:Menu Detail', kwargs={'pk': self.nasi.pk + 100})
+        response = self.client.get(missing_url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.delete(self.detail_url)
+        for tag in (etag, '*'):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=tag)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_etags_differ_per_query_and_view(self):
+        etags = {
+            self.client.get(self.url)['ETag'],
+            self.client.get(self.url, {'category': 'makanan'})['ETag'],
+            self.client.get(self.url, {'page_size': 1})['ETag'],
+            self.client.get(self.detail_url)['ETag'],
+        }
+        self.assertEqual(len(etags), 4)
+
+    def test_writes_invalidate_the_etag(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('menu_api:Menu Reserve'), {'items': [{'id': self.nasi.pk, 'quantity': 1}]}, format='json')
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['stock'], 9)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_is_served_compressed(self):
+        plain = self.client.get(self.url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        with self.assertNumQueries(1):
+            compressed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertLess(len(compressed.content), len(plain.content))
+        self.assertEqual(compressed['ETag'], plain['ETag'])
+
+        brotli_compressed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(brotli_compressed['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(brotli_compressed.content), plain.content)
+
+        refused = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br;q=0, gzip;q=0')
+        self.assertNotIn('Content-Encoding', refused)
+        self.assertEqual(refused.content, plain.content)
+
+
+class MenuChangesTests(MenuTestCase):
+    def setUp(self):
+        super().setUp()
+        self.nasi = self.create_menu()
+        self.teh = self.create_menu(name='Es Teh', price=Decimal('3000'), category=Menu.minuman)
+        self.url = reverse('menu_api:Menu Changes')
+        self.token = encode_token(catalogue_version())
+
+    def changes(self, token):
+        response = self.client.get(self.url, {'since': token} if token else {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_full_sync_without_token(self):
+        data = self.changes(None)
+        self.assertEqual([row['id'] for row in data['changed']], [self.nasi.id, self.teh.id])
+        self.assertEqual(data['deleted'], [])
+        self.assertEqual(data['since'], self.token)
+
+    def test_nothing_changed(self):
+        data = self.changes(self.token)
+        self.assertEqual((data['changed'], data['deleted'], data['since']), ([], [], self.token))
+
+    def test_updates_and_deletes_are_reported(self):
+        self.client.put(reverse('menu_api:Menu Detail', kwargs={'pk': self.teh.pk}), {
+            'name': 'Es Teh Manis', 'price': '3500.00', 'stock': 3, 'description': 'Teh', 'category': 'minuman'
+        }, format='json')
+        self.client.delete(reverse('menu_api:Menu Detail', kwargs={'pk': self.nasi.pk}))
+
+        data = self.changes(self.token)
+        self.assertEqual([row['name'] for row in data['changed']], ['Es Teh Manis'])
+        self.assertEqual(data['deleted'], [self.nasi.id])
+        self.assertEqual(self.changes(data['since'])['changed'], [])
+
+    def test_bulk_and_reserve_writes_are_reported(self):
+        self.client.post(reverse('menu_api:Menu Reserve'), {'items': [{'id': self.nasi.pk, 'quantity': 1}]}, format='json')
+        self.assertEqual([row['id'] for row in self.changes(self.token)['changed']], [self.nasi.id])
+
+        self.client.post(reverse('menu_api:Menu Bulk'), [{
+            'id': self.teh.pk, 'name': 'Es Teh', 'price': '3000.00', 'stock': 3, 'description': 'Teh', 'category': 'minuman'
+        }], format='json')
+        self.assertEqual([row['id'] for row in self.changes(self.token)['changed']], [self.nasi.id, self.teh.id])
+
+    def test_uncommitted_versions_are_left_for_the_next_call(self):
+        # A write that has taken the next version but not committed yet
+        # looks, to the token, like a row past the current version.
+        Menu.objects.filter(pk=self.teh.pk).update(change_seq=catalogue_version() + 1)
+        data = self.changes(self.token)
+        self.assertEqual((data['changed'], data['since']), ([], self.token))
+
+        CatalogueVersion.objects.update(value=F('value') + 1)
+        self.assertEqual([row['id'] for row in self.changes(data['since'])['changed']], [self.teh.id])
+
+    def test_changes_are_range_scans(self):
+        since = decode_token(self.token)
+        plan = Menu.objects.filter(change_seq__gt=since).order_by('change_seq', 'id').explain()
+        self.assertIn('INDEX menu_api_menu_change_seq', plan)
+        plan = MenuTombstone.objects.filter(change_seq__gt=since).order_by('change_seq').explain()
+        self.assertIn('INDEX menu_api_menutombstone_change_seq', plan)
+
+    def test_invalid_tokens(self):
+        timestamp = base64.urlsafe_b64encode(timezone.now().isoformat().encode()).decode().rstrip('=')
+        for token in ('not-a-token', timestamp, encode_token('-1')):
+            response = self.client.get(self.url, {'since': token})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, token)
+
+    def test_tokens_before_pruned_tombstones_expire(self):
+        MenuTombstone.objects.create(menu_id=100, change_seq=decode_token(self.token), deleted_at=timezone.now() - datetime.timedelta(days=31))
+        menu_id = self.nasi.pk
+        self.nasi.delete()
+        self.assertFalse(MenuTombstone.objects.filter(menu_id=100).exists())
+
+        response = self.client.get(self.url, {'since': encode_token(decode_token(self.token) - 1)})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        self.assertEqual(self.changes(self.token)['deleted'], [menu_id])
+
+
+class MenuEventsTests(MenuTestCase):
+    def test_feed_explains_itself_outside_asgi(self):
+        self.assertEqual(reverse('menu_api:Menu Events'), EVENTS_PATH)
+        self.client.credentials()
+        response = self.client.get(EVENTS_PATH)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn('ASGI', response.data['detail'])
+
+    async def test_slow_subscribers_lose_the_oldest_events(self):
+        events = Broadcaster(queue_size=2)
+        subscription = events.subscribe()
+        for number in range(3):
+            events.publish('stock', {'id': 1, 'stock': number})
+
+        messages = events.drain(subscription)
+        self.assertEqual([message.split(b'\n')[1] for message in messages], [b'event: dropped', b'event: stock', b'event: stock'])
+        self.assertIn(b'"count":1', messages[0])
+        self.assertIn(b'"stock":1', messages[1])
+        self.assertEqual(events.drain(subscription), [])
+
+        events.unsubscribe(subscription)
+        self.assertEqual(events.subscriber_count, 0)
+
+    def test_committed_writes_are_published(self):
+        with mock.patch.object(broadcaster, 'subscriber_count', 1), mock.patch.object(broadcaster, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                menu = self.create_menu()
+                menu.name = 'Nasi Uduk'
+                menu.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('menu_api:Menu Reserve'), {'items': [{'id': menu.pk, 'quantity': 2}]}, format='json')
+            menu_id = menu.pk
+            with self.captureOnCommitCallbacks(execute=True):
+                menu.delete()
+
+        self.assertEqual([call.args[0] for call in publish.call_args_list], ['created', 'updated', 'stock', 'deleted'])
+        self.assertEqual(publish.call_args_list[1].args[1]['name'], 'Nasi Uduk')
+        self.assertEqual(publish.call_args_list[2].args[1], {'id': menu_id, 'stock': 8})
+
+    def test_nothing_is_published_without_subscribers(self):
+        with mock.patch.object(broadcaster, 'publish') as publish, self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.create_menu()
+        publish.assert_not_called()
+        self.assertEqual(callbacks, [])
+
+    def scope(self, authorization=None):
+        headers = [(b'authorization', authorization.encode())] if authorization else []
+        return {'type': 'http', 'method': 'GET', 'path': EVENTS_PATH, 'query_string': b'', 'headers': headers}
+
+    async def test_feed_requires_authentication(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await application(self.scope(), None, send)
+        self.assertEqual(sent[0]['status'], 401)
+
+    async def test_feed_streams_events_until_the_client_disconnects(self):
+        incoming = asyncio.Queue()
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def wait_for(condition):
+            for _ in range(200):
+                if condition():
+                    return
+                await asyncio.sleep(0.01)
+            self.fail('timed out')
+
+        # A signed token, as the test database can't be read from the
+        # thread the feed authenticates on.
+        token = SignedToken.issue(self.user)
+        feed = asyncio.ensure_future(application(self.scope(f'Bearer {token}'), incoming.get, send))
+        await wait_for(lambda: broadcaster.subscriber_count == 1)
+        # Published from another thread, as a sync view would.
+        await sync_to_async(broadcaster.publish, thread_sensitive=False)('stock', {'id': 1, 'stock': 3})
+        await wait_for(lambda: len(sent) == 3)
+
+        await incoming.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(feed, 1)
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        self.assertIn(b'event: stock\ndata: {"id":1,"stock":3}\n\n', sent[2]['body'])
+        self.assertEqual(broadcaster.subscriber_count, 0)
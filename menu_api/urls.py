@@ -6,6 +6,11 @@ app_name = 'menu_api'
 
 urlpatterns = [
     path('', views.MenuList.as_view(), name = 'Menu List'),
+    path('bulk/', views.MenuBulk.as_view(), name = 'Menu Bulk'),
+    path('changes/', views.MenuChanges.as_view(), name = 'Menu Changes'),
+    path('cache/', views.MenuCacheStats.as_view(), name = 'Menu Cache Stats'),
+    path('reserve/', views.MenuReserve.as_view(), name = 'Menu Reserve'),
+    path('events/', views.MenuEventsUnavailable.as_view(), name = 'Menu Events'),
     path('<str:pk>/', views.MenuDetail.as_view(), name = 'Menu Detail')
 ]
 urlpatterns = format_suffix_patterns(urlpatterns)
\ No newline at end of file
@@ -1,21 +1,90 @@
+import hashlib
+
+from django.db import DEFAULT_DB_ALIAS
 from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
 from rest_framework.views import APIView
+from menu_api.cache import catalogue_cache, catalogue_version, negotiate_encoding
+from menu_api.events import publish_menu
+from menu_api.filters import filter_menu
 from menu_api.models import Menu
-from menu_api.serializers import MenuSerializer
+from menu_api.serializers import MenuBulkSerializer, MenuSerializer, ReservationSerializer
+from menu_api.stock import MenuNotFound, ReservationFailed, reserve_stock
+from menu_api.sync import decode_token, menu_changes
 from rest_framework.response import Response
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
+from Magerbun_Profile.pagination import KeysetPagination
+from Magerbun_Profile.serialization import FastJSONRenderer, ValuesSerializer
+from Magerbun_Profile.streaming import streaming_json_response, wants_stream
 
 # Create your views here.
 
+# Rows for list endpoints, built straight from `.values_list()`.
+menu_rows = ValuesSerializer(MenuSerializer)
+menu_pagination = KeysetPagination(ordering=('id',))
+
+def _menu_etag(request, version, *parts):
+    """
+    A weak ETag for one rendering of the catalogue at `version`. Every
+    write bumps the shared version in its transaction, so it needs no look
+    at the rows; the hash tells apart the views, query strings and media
+    types.
+    """
+    key = '\n'.join([request.accepted_media_type, *map(str, parts)])
+    return 'W/' + quote_etag(f'{version}-{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}')
+
+def _menu_not_modified(request, etag):
+    ifNoneMatch = request.META.get('HTTP_IF_NONE_MATCH')
+    if not ifNoneMatch:
+        return False
+    # If-None-Match uses the weak comparison, so W/ prefixes don't matter.
+    etags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(ifNoneMatch)]
+    return '*' in etags or etag[2:] in etags
+
+def _with_etag(response, etag):
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+    return response
+
 @permission_classes([IsAuthenticated|IsAdminUser])
 class MenuList(APIView):
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
     def get(self, request, format=None):
-        menu = Menu.objects.all()
-        serializers = MenuSerializer(menu, many=True)
-        return Response(serializers.data)
+        # Read the version before any row, so a write racing this request
+        # can only make the ETag stale, never the payload.
+        version = catalogue_version()
+        etag = _menu_etag(request, version, 'list', sorted(request.query_params.lists()))
+        if _menu_not_modified(request, etag):
+            return _with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+        if not request.query_params and self.renders_plain_json(request):
+            encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            coding, payload = catalogue_cache.get_encoded(version, self.render_catalogue, encoding)
+            response = HttpResponse(payload, content_type='application/json')
+            if coding != 'identity':
+                response['Content-Encoding'] = coding
+            return _with_etag(response, etag)
+
+        menu = filter_menu(Menu.objects.order_by('id'), request.query_params)
+        if wants_stream(request):
+            return _with_etag(streaming_json_response(menu, menu_rows), etag)
+        if menu_pagination.is_requested(request):
+            return _with_etag(Response(menu_pagination.paginate(menu, request, menu_rows)), etag)
+        return _with_etag(Response(menu_rows.rows(menu)), etag)
+
+    def renders_plain_json(self, request):
+        return type(request.accepted_renderer) is FastJSONRenderer and 'indent' not in request.accepted_media_type
+
+    def render_catalogue(self):
+        # Kept under the primary's version until the next write, so built
+        # from the primary: a lagging replica would pin its old rows there.
+        return FastJSONRenderer().render(menu_rows.rows(Menu.objects.using(DEFAULT_DB_ALIAS).order_by('id')))
 
     def post(self, request, format=None):
         serializer = MenuSerializer(data=request.data)
@@ -24,6 +93,76 @@ class MenuList(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@permission_classes([IsAuthenticated|IsAdminUser])
+class MenuBulk(APIView):
+    """
+    Create and replace many menus in one request: a list of menus, where
+    the ones with an `id` update that menu. Errors are reported per item,
+    in a list aligned with the payload, and then nothing is saved.
+    """
+
+    def post(self, request, format=None):
+        serializer = MenuBulkSerializer(data=request.data, many=True)
+        if serializer.is_valid():
+            menus = serializer.save()
+            # bulk_create/bulk_update send no post_save.
+            for item, menu in zip(serializer.validated_data, menus):
+                publish_menu('updated' if item.get('id') else 'created', menu)
+            return Response(serializer.data)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@permission_classes([IsAuthenticated|IsAdminUser])
+class MenuReserve(APIView):
+    """
+    Take stock off several menus at once: `{"items": [{"id": 1, "quantity": 2}, ...]}`.
+    Either every item is reserved or, with 404/409, none is.
+    """
+
+    def post(self, request, format=None):
+        serializer = ReservationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        items = [(item['id'], item['quantity']) for item in serializer.validated_data['items']]
+        try:
+            remaining = reserve_stock(items)
+        except ReservationFailed as error:
+            code = status.HTTP_404_NOT_FOUND if isinstance(error, MenuNotFound) else status.HTTP_409_CONFLICT
+            return Response({'id': error.menu_id, 'detail': error.reason}, status=code)
+        return Response({'items': [{'id': menu_id, 'stock': stock} for menu_id, stock in sorted(remaining.items())]})
+
+@permission_classes([IsAuthenticated|IsAdminUser])
+class MenuChanges(APIView):
+    """
+    `?since=<token>` returns `{"changed": [...], "deleted": [ids], "since":
+    <next token>}`; without a token every menu is returned.
+    """
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request, format=None):
+        token = request.query_params.get('since')
+        since = decode_token(token) if token else None
+        return Response(menu_changes(since, menu_rows))
+
+@permission_classes([AllowAny])
+class MenuEventsUnavailable(APIView):
+    """
+    The events feed is served by the ASGI application before requests
+    reach Django, so this only answers WSGI deployments, which can't hold
+    the stream open.
+    """
+
+    def get(self, request, format=None):
+        return Response(
+            {'detail': 'Menu events are only served by the ASGI application; run the project under an ASGI server to subscribe.'},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+@permission_classes([IsAdminUser])
+class MenuCacheStats(APIView):
+    def get(self, request, format=None):
+        return Response(catalogue_cache.stats())
+
 @permission_classes([IsAuthenticated|IsAdminUser])
 class MenuDetail(APIView):
     def get_object(self, pk):
@@ -33,9 +172,14 @@ class MenuDetail(APIView):
             raise Http404
 
     def get(self, request, pk, format=None):
+        etag = _menu_etag(request, catalogue_version(), 'detail', pk)
+        # The version says nothing about whether this menu exists, and
+        # `If-None-Match: *` matches any tag, so check before a 304.
+        if _menu_not_modified(request, etag) and Menu.objects.filter(pk=pk).exists():
+            return _with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
         menu = self.get_object(pk)
         serializer = MenuSerializer(menu)
-        return Response(serializer.data)
+        return _with_etag(Response(serializer.data), etag)
 
     def put(self, request, pk, format=None):
         menu = self.get_object(pk)